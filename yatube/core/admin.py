@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from core.models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'priority', 'attempts', 'run_at', 'created',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('created',)
+
+
+admin.site.register(Task, TaskAdmin)
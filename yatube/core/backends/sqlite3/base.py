@@ -0,0 +1,33 @@
+"""
+Бэкенд SQLite для конкурентной нагрузки.
+
+Каждое новое соединение получает PRAGMA из settings.SQLITE_PRAGMAS (WAL,
+busy_timeout, mmap_size, synchronous=NORMAL): в режиме WAL читатели не
+ждут писателя, а busy_timeout заставляет писателей ждать блокировку, а не
+сразу падать с «database is locked».
+
+Транзакции открываются через BEGIN IMMEDIATE: блокировка на запись
+берется в начале transaction.atomic(), пока busy_timeout еще может ее
+дождаться. Отложенная транзакция, которая сначала читает, а потом
+пишет, при конфликте получает ошибку без ожидания.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        try:
+            for name, value in settings.SQLITE_PRAGMAS.items():
+                connection.execute(f'PRAGMA {name} = {value}')
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if settings.SQLITE_IMMEDIATE_TRANSACTIONS:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,386 @@
+"""
+Бэкенды кэша для нескольких процессов WSGI-сервера.
+
+SQLiteCache -- общий для всех процессов кэш в файле SQLite (режим WAL),
+не требующий внешних сервисов.
+
+TwoTierCache ставит перед общим кэшем (OPTIONS['SHARED'] -- имя другого
+кэша из CACHES) ограниченный по размеру LRU-кэш в памяти процесса.
+Запись идет в оба уровня. Вместе со значением в общем кэше хранится
+штамп версии; значение из памяти процесса без проверки отдается не
+дольше LOCAL_TIMEOUT секунд, после чего штамп сверяется с общим кэшем.
+Так изменения и удаления, сделанные другими процессами, становятся
+видны не позже чем через LOCAL_TIMEOUT.
+
+Попадания и промахи каждого уровня считаются в метрике
+yatube_cache_total (core.metrics).
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.metrics import CACHE_LOOKUPS
+
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+STAMP_SUFFIX = ':stamp'
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в таблице SQLite; LOCATION -- путь к файлу базы."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _keys(self, keys, version):
+        made = {}
+        for key in keys:
+            full = self.make_key(key, version=version)
+            self.validate_key(full)
+            made[full] = key
+        return made
+
+    def get_many(self, keys, version=None):
+        made = self._keys(keys, version)
+        if not made:
+            return {}
+        placeholders = ','.join('?' * len(made))
+        rows = self.connection.execute(
+            'SELECT key, value FROM cache WHERE key IN '
+            f'({placeholders}) AND (expires IS NULL OR expires > ?)',
+            [*made, time.time()],
+        )
+        return {made[key]: pickle.loads(value) for key, value in rows}
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def _rows(self, data, timeout, version):
+        expires = self.get_backend_timeout(timeout)
+        for key, value in data.items():
+            full = self.make_key(key, version=version)
+            self.validate_key(full)
+            yield full, pickle.dumps(value, PICKLE_PROTOCOL), expires
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = list(self._rows(data, timeout, version))
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                rows,
+            )
+            self._maybe_cull(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ((full, pickled, expires),) = self._rows({key: value}, timeout,
+                                                 version)
+        cursor = self.connection.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            'expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (full, pickled, expires, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        full = self.make_key(key, version=version)
+        self.validate_key(full)
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), full, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        made = self._keys(keys, version)
+        if made:
+            placeholders = ','.join('?' * len(made))
+            self.connection.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', list(made)
+            )
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def has_key(self, key, version=None):
+        return bool(self.get_many([key], version=version))
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def _maybe_cull(self, connection):
+        # Считать строки на каждой записи дорого, поэтому устаревшие и
+        # лишние записи удаляются в среднем раз на _cull_frequency ** 2
+        # записей.
+        if random.randrange(max(self._cull_frequency, 1) ** 2):
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        (count,) = connection.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count - self._max_entries
+                 + self._max_entries // max(self._cull_frequency, 1),),
+            )
+
+
+class LocalEntry:
+    __slots__ = ('data', 'stamp', 'expires', 'checked')
+
+    def __init__(self, data, stamp, expires, checked):
+        self.data = data
+        self.stamp = stamp
+        self.expires = expires
+        self.checked = checked
+
+    @property
+    def size(self):
+        return len(self.data)
+
+
+class LocalStore:
+    """LRU-словарь с ограничением суммарного размера значений."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires is not None and entry.expires <= time.time():
+                self._delete(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self._delete(key)
+            if entry.size > self.max_bytes:
+                return
+            self.entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, old = self.entries.popitem(last=False)
+                self.size -= old.size
+
+    def _delete(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def delete(self, key):
+        with self.lock:
+            self._delete(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+# Django создает экземпляры бэкендов кэша для каждого потока, а уровень
+# в памяти должен быть общим для всех потоков процесса.
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 1)
+        max_bytes = options.get('LOCAL_MAX_BYTES', 32 * 1024 * 1024)
+        with _stores_lock:
+            self.local = _stores.setdefault(
+                location or self.shared_alias, LocalStore(max_bytes)
+            )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    @staticmethod
+    def stamp_key(key):
+        return f'{key}{STAMP_SUFFIX}'
+
+    def _local_set(self, key, value, stamp, expires, now):
+        data = pickle.dumps(value, PICKLE_PROTOCOL)
+        self.local.set(key, LocalEntry(data, stamp, expires, now))
+
+    # Интерфейс BaseCache.
+
+    def get_many(self, keys, version=None):
+        now = time.monotonic()
+        found = {}
+        stale = {}
+        missing = []
+        for key in keys:
+            full = self.make_key(key, version=version)
+            self.validate_key(full)
+            entry = self.local.get(full)
+            if entry is None:
+                missing.append(key)
+            elif now - entry.checked < self.local_timeout:
+                found[key] = pickle.loads(entry.data)
+            else:
+                stale[key] = entry
+        CACHE_LOOKUPS.inc(len(found), tier='local', result='hit')
+        if not stale and not missing:
+            return found
+
+        # Для устаревших записей достаточно сверить штамп, для
+        # отсутствующих нужно само значение.
+        shared = self.shared.get_many(
+            [self.stamp_key(key) for key in (*stale, *missing)]
+            + missing,
+            version=version,
+        )
+        changed = []
+        for key, entry in stale.items():
+            if shared.get(self.stamp_key(key)) == entry.stamp:
+                entry.checked = now
+                found[key] = pickle.loads(entry.data)
+            else:
+                changed.append(key)
+        CACHE_LOOKUPS.inc(len(stale) - len(changed), tier='local',
+                          result='hit')
+        CACHE_LOOKUPS.inc(len(changed) + len(missing), tier='local',
+                          result='miss')
+        if changed:
+            shared.update(self.shared.get_many(changed, version=version))
+        hits = 0
+        for key in (*changed, *missing):
+            full = self.make_key(key, version=version)
+            if key in shared:
+                hits += 1
+                found[key] = shared[key]
+                self._local_set(
+                    full, shared[key], shared.get(self.stamp_key(key)),
+                    None, now,
+                )
+            else:
+                self.local.delete(full)
+        CACHE_LOOKUPS.inc(hits, tier='shared', result='hit')
+        CACHE_LOOKUPS.inc(len(changed) + len(missing) - hits,
+                          tier='shared', result='miss')
+        return found
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        stamp = uuid.uuid4().hex[:12]
+        shared = dict(data)
+        shared.update({self.stamp_key(key): stamp for key in data})
+        self.shared.set_many(shared, timeout, version=version)
+        now = time.monotonic()
+        expires = self.get_backend_timeout(timeout)
+        for key, value in data.items():
+            self._local_set(
+                self.make_key(key, version=version), value, stamp,
+                expires, now,
+            )
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        stamp = uuid.uuid4().hex[:12]
+        self.shared.set(self.stamp_key(key), stamp, timeout, version=version)
+        self._local_set(
+            self.make_key(key, version=version), value, stamp,
+            self.get_backend_timeout(timeout), time.monotonic(),
+        )
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        self.shared.touch(self.stamp_key(key), timeout, version=version)
+        if not self.shared.touch(key, timeout, version=version):
+            return False
+        entry = self.local.get(self.make_key(key, version=version))
+        if entry is not None:
+            entry.expires = self.get_backend_timeout(timeout)
+        return True
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(
+            keys + [self.stamp_key(key) for key in keys], version=version
+        )
+        for key in keys:
+            self.local.delete(self.make_key(key, version=version))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def clear(self):
+        self.shared.clear()
+        self.local.clear()
@@ -0,0 +1,105 @@
+"""
+Чтение лент с реплик базы.
+
+settings.DATABASE_REPLICAS -- алиасы баз только для чтения с копией
+основной. Запросы на чтение из view, обернутых use_replica, уходят на
+случайную реплику, все остальные запросы и все записи -- в основную базу.
+
+Реплика отстает от основной, поэтому после любого изменяющего запроса
+(POST и т. п.) ReplicaPinMiddleware ставит cookie: пока она действует
+(settings.REPLICA_PIN_SECONDS), запросы пользователя читают основную базу
+и он сразу видит свои изменения. Кэш лент при этом не должен запомнить
+страницу, прочитанную с отстающей реплики. Процесс, который обновляет
+реплики (локально manage.py replicate), сообщает mark_replicated() время,
+до которого они содержат все изменения, а posts.generations переводит
+запрос на основную базу (read_primary), если область кэша изменилась
+позже. Пока время не сообщено, такие запросы всегда читают основную базу.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_until'
+REPLICATED_KEY = 'replicas:copied_at'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_local = threading.local()
+
+
+def is_pinned(request):
+    """Пользователь недавно что-то изменил и читает основную базу."""
+    try:
+        return float(request.COOKIES[PIN_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+def use_replica(view):
+    """Разрешает view читать с реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if is_pinned(request):
+            return view(request, *args, **kwargs)
+        _local.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _local.replica = False
+    return wrapper
+
+
+def read_primary():
+    """Остальные запросы текущего view читают основную базу."""
+    _local.replica = False
+
+
+def mark_replicated(copied_at):
+    """Все реплики содержат изменения, зафиксированные до copied_at."""
+    cache.set(REPLICATED_KEY, copied_at, timeout=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        # Внутри транзакции читаются ее собственные изменения.
+        if (getattr(_local, 'replica', False)
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же строки, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS
+                and response.status_code < 500):
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, f'{time.time() + seconds:.0f}',
+                max_age=seconds, httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
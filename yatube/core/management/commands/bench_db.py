@@ -0,0 +1,138 @@
+import math
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from core import write_queue
+from posts.models import Comment, Post, User
+
+# Настройки SQLite по умолчанию: журнал отката, отложенные транзакции,
+# каждая запись в своей транзакции.
+BASELINE = {
+    'SQLITE_PRAGMAS': {'journal_mode': 'DELETE'},
+    'SQLITE_IMMEDIATE_TRANSACTIONS': False,
+    'SQLITE_WRITE_QUEUE': False,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность чтения и записи в SQLite при '
+        'одновременной нагрузке со стандартными и с настроенными '
+        'параметрами (core.backends.sqlite3, core.write_queue).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность каждого замера.',
+        )
+        parser.add_argument(
+            '--mode', choices=('baseline', 'tuned', 'both'), default='both',
+        )
+
+    def read(self, post_ids):
+        list(Post.objects.select_related('author', 'group')[:10])
+        list(Comment.objects.filter(
+            post_id=random.choice(post_ids)
+        ).select_related('author')[:20])
+
+    def write(self, post_ids, user_ids):
+        return write_queue.execute(
+            lambda: Comment.objects.create(
+                post_id=random.choice(post_ids),
+                author_id=random.choice(user_ids),
+                text='нагрузочный комментарий',
+            ).id
+        )
+
+    def worker(self, action, deadline, stats):
+        latencies, errors, created = [], 0, []
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    result = action()
+                except OperationalError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if result is not None:
+                    created.append(result)
+        finally:
+            connection.close()
+        with self.lock:
+            stats['latencies'].extend(latencies)
+            stats['errors'] += errors
+            stats['created'].extend(created)
+
+    def run(self, label, options, post_ids, user_ids):
+        connections.close_all()
+        # Режим журнала меняется, только пока к файлу нет других
+        # соединений, поэтому первое соединение открывается до потоков.
+        connection.ensure_connection()
+        deadline = time.monotonic() + options['seconds']
+        reads = {'latencies': [], 'errors': 0, 'created': []}
+        writes = {'latencies': [], 'errors': 0, 'created': []}
+        threads = [
+            threading.Thread(target=self.worker, args=(
+                lambda: self.read(post_ids), deadline, reads,
+            ))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=self.worker, args=(
+                lambda: self.write(post_ids, user_ids), deadline, writes,
+            ))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        Comment.objects.filter(id__in=writes['created']).delete()
+        connections.close_all()
+        seconds = options['seconds']
+        self.stdout.write(
+            f'{label:<9} чтений {len(reads["latencies"]) / seconds:8.0f}/с  '
+            f'записей {len(writes["latencies"]) / seconds:7.0f}/с  '
+            f'p95 записи {self.p95(writes["latencies"]):8.1f} мс  '
+            f'ошибок {reads["errors"] + writes["errors"]}'
+        )
+
+    def p95(self, latencies):
+        if not latencies:
+            return 0.0
+        ordered = sorted(latencies)
+        return ordered[math.ceil(len(ordered) * 0.95) - 1] * 1000
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда замеряет только SQLite')
+        post_ids = list(Post.objects.values_list('id', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('id', flat=True)[:1000])
+        if not post_ids or not user_ids:
+            raise CommandError(
+                'В базе нет данных, запустите сначала generate_data'
+            )
+        self.lock = threading.Lock()
+        self.stdout.write(
+            f'Читателей: {options["readers"]}, '
+            f'писателей: {options["writers"]}, '
+            f'{options["seconds"]:g} с на замер'
+        )
+        # Режим журнала хранится в файле базы, поэтому стандартные
+        # настройки замеряются первыми: поток очереди записи держит
+        # соединение до конца процесса.
+        if options['mode'] in ('baseline', 'both'):
+            with override_settings(**BASELINE):
+                self.run('baseline', options, post_ids, user_ids)
+        if options['mode'] in ('tuned', 'both'):
+            self.run('tuned', options, post_ids, user_ids)
+        # Новое соединение возвращает файлу режим журнала из настроек.
+        connection.ensure_connection()
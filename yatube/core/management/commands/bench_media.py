@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views.static import serve as static_serve
+
+from core import media
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность core.media.serve '
+        'и django.views.static.serve.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Сколько запросов выполнить для каждого случая.',
+        )
+        parser.add_argument(
+            '--size', type=int, default=200 * 1024,
+            help='Размер тестового файла в байтах.',
+        )
+
+    def measure(self, view, request, path, **kwargs):
+        started = time.perf_counter()
+        for _ in range(self.requests):
+            response = view(request, path, **kwargs)
+            for _ in response:
+                pass
+            response.close()
+        return self.requests / (time.perf_counter() - started)
+
+    def report(self, label, rate, baseline):
+        self.stdout.write(
+            f'{label:<32}{rate:>10.0f} запр./с{rate / baseline:>8.1f}x'
+        )
+
+    def handle(self, *args, **options):
+        self.requests = options['requests']
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=settings.MEDIA_ROOT, suffix='.jpg'
+        ) as file:
+            file.write(os.urandom(options['size']))
+            file.flush()
+            path = os.path.basename(file.name)
+            self.run(path)
+
+    def run(self, path):
+        factory = RequestFactory()
+        request = factory.get(f'{settings.MEDIA_URL}{path}')
+        baseline = self.measure(
+            static_serve, request, path, document_root=settings.MEDIA_ROOT
+        )
+        self.report('django.views.static.serve', baseline, baseline)
+        with override_settings(MEDIA_OFFLOAD=None):
+            rate = self.measure(media.serve, request, path)
+            self.report('core.media.serve', rate, baseline)
+            ranged = factory.get(
+                f'{settings.MEDIA_URL}{path}', HTTP_RANGE='bytes=0-65535'
+            )
+            rate = self.measure(media.serve, ranged, path)
+            self.report('core.media.serve, Range 64 КБ', rate, baseline)
+            etag = media.serve(request, path)['ETag']
+            conditional = factory.get(
+                f'{settings.MEDIA_URL}{path}', HTTP_IF_NONE_MATCH=etag
+            )
+            rate = self.measure(media.serve, conditional, path)
+            self.report('core.media.serve, 304', rate, baseline)
+        with override_settings(MEDIA_OFFLOAD=media.OFFLOAD_X_ACCEL):
+            rate = self.measure(media.serve, request, path)
+            self.report('core.media.serve, X-Accel', rate, baseline)
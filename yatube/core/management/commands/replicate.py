@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import db_router
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики settings.DATABASE_REPLICAS '
+        '(замена репликации для локальной проверки core.db_router).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование каждые N секунд; 0 -- один раз.',
+        )
+
+    def copy(self, source):
+        for alias in settings.DATABASE_REPLICAS:
+            target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплик нет, задайте переменную окружения DATABASE_REPLICAS'
+            )
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        copied = None
+        try:
+            while True:
+                # Реплики будут содержать все, что зафиксировано до этого
+                # момента: и после копирования, и если база не менялась.
+                copied_at = time.time()
+                # data_version меняется, когда базу изменило другое
+                # соединение: неизменную базу копировать незачем.
+                version = source.execute('PRAGMA data_version').fetchone()
+                if version != copied:
+                    started = time.perf_counter()
+                    self.copy(source)
+                    copied = version
+                    self.stdout.write(
+                        f'Реплики обновлены за '
+                        f'{time.perf_counter() - started:.2f} с'
+                    )
+                db_router.mark_replicated(copied_at)
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            source.close()
@@ -0,0 +1,55 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import task_worker, tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS,
+            help='Число рабочих процессов.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.TASKS_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval, once = options['poll_interval'], options['once']
+        if options['workers'] <= 1:
+            try:
+                tasks.work(poll_interval, once)
+            except KeyboardInterrupt:
+                pass
+            return
+        # spawn вместо fork: процессы не должны наследовать соединения
+        # с базой.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(
+                target=task_worker.main, args=(poll_interval, once),
+                name=f'tasks-{number}',
+            )
+            for number in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Запущено рабочих процессов: {len(processes)}')
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
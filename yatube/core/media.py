@@ -0,0 +1,156 @@
+"""
+Раздача загруженных файлов (MEDIA_ROOT).
+
+Если перед приложением стоит nginx или Apache, тело файла отдает он:
+view только проверяет путь и возвращает заголовок X-Accel-Redirect или
+X-Sendfile (settings.MEDIA_OFFLOAD). Иначе файл отдается через
+FileResponse, который WSGI-сервер может передать через sendfile.
+
+Ответы получают сильный ETag из размера и времени изменения файла,
+поддерживаются условные запросы и запросы одного диапазона байтов.
+Миниатюры sorl-thumbnail (settings.MEDIA_IMMUTABLE_PREFIXES) никогда не
+меняются под тем же именем, поэтому кэшируются браузером на год.
+"""
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+OFFLOAD_X_ACCEL = 'x-accel-redirect'
+OFFLOAD_X_SENDFILE = 'x-sendfile'
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_etag(stat):
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном.
+
+    Возвращает (start, end) включительно, None, если заголовок нужно
+    проигнорировать и отдать файл целиком, или ValueError, если диапазон
+    не пересекается с файлом.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload(path, fullpath, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_OFFLOAD == OFFLOAD_X_ACCEL:
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_OFFLOAD_PREFIX + path
+        )
+    else:
+        response['X-Sendfile'] = fullpath
+    # Тело и Content-Length подставит веб-сервер, он же обработает Range.
+    return response
+
+
+def _file_response(request, fullpath, size, etag, content_type):
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(fullpath, start, end),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            return response
+    return FileResponse(open(fullpath, 'rb'), content_type=content_type)
+
+
+def _cache_control(response, path):
+    if path.startswith(tuple(settings.MEDIA_IMMUTABLE_PREFIXES)):
+        patch_cache_control(response, public=True,
+                            max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True,
+                            max_age=settings.MEDIA_MAX_AGE)
+
+
+@require_safe
+def serve(request, path):
+    """Отдает файл path из MEDIA_ROOT."""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Файл не найден')
+    if not S_ISREG(stat.st_mode):
+        raise Http404('Файл не найден')
+
+    etag = get_etag(stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        content_type, encoding = mimetypes.guess_type(fullpath)
+        content_type = content_type or 'application/octet-stream'
+        if settings.MEDIA_OFFLOAD:
+            response = _offload(path, fullpath, content_type)
+        else:
+            response = _file_response(
+                request, fullpath, stat.st_size, etag, content_type
+            )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    _cache_control(response, path)
+    return response
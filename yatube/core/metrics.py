@@ -0,0 +1,301 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Счетчики и гистограммы хранятся в памяти процесса. Если задан
+settings.METRICS_DIR, каждый процесс не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сохраняет свои значения в файл
+<METRICS_DIR>/<pid>.json, а страница метрик складывает файлы всех
+процессов: так несколько воркеров WSGI-сервера отдают общую картину.
+Каталог нужно очищать при перезапуске сервера.
+
+MetricsMiddleware замеряет время ответа и число запросов к базе для
+каждого view (resolver_match.view_name). Страница метрик доступна только
+с адресов settings.METRICS_ALLOWED_IPS.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = tuple(2 ** power * 1024 for power in range(0, 15, 2))
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\')
+            .replace('\n', r'\n').replace('"', r'\"'))
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f'{{{inner}}}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name}: нужны метки {", ".join(self.labelnames)}'
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, values, other):
+        for key, value in other.items():
+            values[key] = values.get(key, 0) + value
+
+    def expose(self, values):
+        for key, value in sorted(values.items()):
+            labels = _labels(self.labelnames, key)
+            yield f'{self.name}{labels} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            # Накопительные счетчики корзин (последняя, +Inf, равна числу
+            # наблюдений) и сумма значений.
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-1] += value
+
+    def merge(self, values, other):
+        for key, state in other.items():
+            current = values.get(key)
+            if current is None:
+                values[key] = list(state)
+            else:
+                values[key] = [a + b for a, b in zip(current, state)]
+
+    def expose(self, values):
+        for key, state in sorted(values.items()):
+            for bound, count in zip(self.buckets, state):
+                labels = _labels(
+                    self.labelnames, key, (('le', _format_value(bound)),)
+                )
+                yield f'{self.name}_bucket{labels} {count}'
+            labels = _labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(state[-1])}'
+            yield f'{self.name}_count{labels} {state[-2]}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.flushed = 0.0
+        self.exit_hook = False
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Метрика {metric.name} уже есть')
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    json.dumps(key): (
+                        list(value) if isinstance(value, list) else value
+                    )
+                    for key, value in metric.values.items()
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force=False):
+        """Сохраняет значения процесса в METRICS_DIR."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        if not self.exit_hook:
+            # Хук ставится здесь, а не при импорте: при выходе процесса,
+            # который не настроил Django, settings прочитать нельзя.
+            atexit.register(self.flush, force=True)
+            self.exit_hook = True
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temp = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temp, path)
+
+    def collect(self):
+        """Значения всех процессов: name -> {labels: value}."""
+        snapshots = [self.snapshot()]
+        directory = settings.METRICS_DIR
+        if directory:
+            self.flush(force=True)
+            snapshots = []
+            for name in os.listdir(directory):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(directory, name)) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+        result = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, values in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                metric.merge(result[name], {
+                    tuple(json.loads(key)): value
+                    for key, value in values.items()
+                })
+        return result
+
+    def expose(self):
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {_escape(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.expose(values))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_duration_seconds',
+    'Время ответа по view.',
+    ('view', 'method'),
+)
+REQUEST_QUERIES = Histogram(
+    'yatube_request_db_queries',
+    'Число запросов к базе за один ответ по view.',
+    ('view',),
+    buckets=COUNT_BUCKETS,
+)
+FRAGMENT_CACHE = Counter(
+    'yatube_fragment_cache_total',
+    'Обращения к кэшу фрагментов шаблонов, result: hit или miss.',
+    ('fragment', 'result'),
+)
+CACHE_LOOKUPS = Counter(
+    'yatube_cache_total',
+    'Обращения к уровням кэша (core.cache.TwoTierCache).',
+    ('tier', 'result'),
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_seconds',
+    'Время от постановки картинки в очередь до готовности миниатюр.',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+UPLOAD_BYTES = Histogram(
+    'yatube_upload_size_bytes',
+    'Размер загруженных картинок до обработки.',
+    buckets=SIZE_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    'yatube_task_duration_seconds',
+    'Время выполнения фоновой задачи (core.tasks).',
+    ('task',),
+)
+TASK_LAG_SECONDS = Histogram(
+    'yatube_task_lag_seconds',
+    'Сколько готовая задача ждала в очереди до выполнения.',
+    ('task',),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+TASKS_TOTAL = Counter(
+    'yatube_tasks_total',
+    'Выполненные фоновые задачи, result: done, retry или failed.',
+    ('task', 'result'),
+)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        REQUEST_SECONDS.observe(elapsed, view=view, method=request.method)
+        REQUEST_QUERIES.observe(queries.count, view=view)
+        REGISTRY.flush()
+        return response
+
+
+def export(request):
+    """Страница метрик для Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404('Страница не найдена')
+    return HttpResponse(REGISTRY.expose(), content_type=CONTENT_TYPE)
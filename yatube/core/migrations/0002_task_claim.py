@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Занята до'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='owner',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Рабочий процесс'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=200,
+    )
+    payload = models.TextField(
+        verbose_name='Аргументы в JSON',
+    )
+    priority = models.SmallIntegerField(
+        verbose_name='Приоритет',
+        default=0,
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить не раньше',
+        default=timezone.now,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата постановки',
+        auto_now_add=True,
+    )
+    owner = models.CharField(
+        verbose_name='Рабочий процесс',
+        max_length=100,
+        blank=True,
+    )
+    claimed_until = models.DateTimeField(
+        verbose_name='Занята до',
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='task_queue_idx',
+            ),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
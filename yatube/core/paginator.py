@@ -0,0 +1,240 @@
+import base64
+import binascii
+import collections.abc
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject, cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен, полученный из encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values
+
+
+class CursorPage(collections.abc.Sequence):
+    """
+    Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page в той части, которая
+    нужна шаблонам, но вместо номеров страниц отдает токены курсоров.
+    """
+
+    def __init__(self, object_list, paginator, has_next=False,
+                 has_previous=False, number=None):
+        self.object_list = list(object_list)
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.number = number
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.cursor_for(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.cursor_for(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по уникальному набору полей.
+
+    Страница выбирается условием по ключу последнего показанного объекта,
+    поэтому запрос не использует OFFSET и не считает COUNT(*): время
+    отдачи любой страницы не зависит от ее глубины. Все поля ordering
+    должны сортироваться в одном направлении, а последнее поле должно
+    быть уникальным.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    @cached_property
+    def count(self):
+        """Общее число объектов. Считается только по явному запросу."""
+        return self.object_list.count()
+
+    @cached_property
+    def key_fields(self):
+        opts = self.object_list.model._meta
+        return [opts.get_field(name) for name in self.fields]
+
+    def key(self, obj):
+        if isinstance(obj, dict):
+            return tuple(obj[name] for name in self.fields)
+        return tuple(getattr(obj, name) for name in self.fields)
+
+    def cursor_for(self, obj):
+        return encode_cursor(self.key(obj))
+
+    def parse_cursor(self, token):
+        values = decode_cursor(token)
+        if len(values) != len(self.key_fields):
+            raise InvalidCursor(token)
+        try:
+            return tuple(
+                field.to_python(value)
+                for field, value in zip(self.key_fields, values)
+            )
+        except Exception:
+            raise InvalidCursor(token)
+
+    def keyset(self, queryset, fields, cursor, backwards):
+        """
+        Применяет к queryset условие «после курсора» и сортировку.
+
+        При backwards=True выбираются объекты перед курсором в обратном
+        порядке, чтобы ближайшие к курсору шли первыми.
+        """
+        descending = self.descending != backwards
+        lookup = 'lt' if descending else 'gt'
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(*(prefix + name for name in fields))
+        if cursor is None:
+            return queryset
+        conditions = []
+        for position, name in enumerate(fields):
+            condition = {
+                fields[i]: cursor[i] for i in range(position)
+            }
+            condition[f'{name}__{lookup}'] = cursor[position]
+            conditions.append(Q(**condition))
+        return queryset.filter(reduce(or_, conditions))
+
+    def fetch(self, cursor, backwards, limit):
+        """Возвращает до limit объектов, следующих за курсором."""
+        return list(
+            self.keyset(self.object_list, self.fields, cursor, backwards)
+            [:limit]
+        )
+
+    def fetch_offset(self, offset, limit):
+        return list(self.object_list.order_by(*self.ordering)
+                    [offset:offset + limit])
+
+    def first_page(self):
+        rows = self.fetch(None, False, self.per_page + 1)
+        return CursorPage(
+            rows[:self.per_page], self, has_next=len(rows) > self.per_page,
+        )
+
+    def page_after(self, cursor):
+        rows = self.fetch(cursor, False, self.per_page + 1)
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_next=len(rows) > self.per_page, has_previous=True,
+        )
+
+    def page_before(self, cursor):
+        rows = self.fetch(cursor, True, self.per_page + 1)
+        if len(rows) <= self.per_page:
+            # Дошли до начала ленты: отдаем полную первую страницу.
+            return self.first_page()
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, has_next=True, has_previous=True)
+
+    def page_number(self, number):
+        """
+        Совместимость со старыми ссылками вида ?page=N.
+
+        Страница выбирается через OFFSET, но без COUNT(*), а ссылки с нее
+        уже ведут на курсоры.
+        """
+        offset = (number - 1) * self.per_page
+        rows = self.fetch_offset(offset, self.per_page + 1)
+        if not rows and number > 1:
+            return self.first_page()
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_next=len(rows) > self.per_page, has_previous=number > 1,
+            number=number,
+        )
+
+    def get_page(self, after=None, before=None, number=None):
+        """
+        Возвращает страницу по курсору after/before или по номеру.
+
+        Как и Paginator.get_page, не падает на некорректном вводе и отдает
+        первую страницу.
+        """
+        try:
+            if after:
+                return self.page_after(self.parse_cursor(after))
+            if before:
+                return self.page_before(self.parse_cursor(before))
+        except InvalidCursor:
+            return self.first_page()
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number > 1:
+            return self.page_number(number)
+        return self.first_page()
+
+
+def paginate(request, object_list, paginator_class=CursorPaginator,
+             per_page=None, **kwargs):
+    """
+    Возвращает страницу object_list по параметрам запроса.
+
+    Страница выбирается при первом обращении, поэтому шаблон, который
+    отдает ленту из кэша фрагментов, не делает запросов к базе.
+    """
+    paginator = paginator_class(
+        object_list, per_page or settings.OBJECTS_PER_PAGE, **kwargs
+    )
+    return SimpleLazyObject(lambda: paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        number=request.GET.get('page'),
+    ))
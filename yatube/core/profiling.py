@@ -0,0 +1,227 @@
+"""
+Легкое профилирование запросов в production.
+
+ProfilingMiddleware считает для каждого запроса число и время SQL-запросов
+(connection.execute_wrapper), время рендера шаблонов, попадания и промахи
+кэша и общее время, отдает их в заголовке Server-Timing и пишет строкой
+лога key=value в логгер core.profiling. Каждый PROFILING_SAMPLE_RATE-й
+запрос дополнительно профилируется cProfile, а статистика сохраняется в
+PROFILING_DIR.
+
+Время шаблонов считает бэкенд ProfilingTemplates, попадания кэша --
+обертка ProfilingCache; settings подключает их только вместе с
+PROFILING, сами классы Django не изменяются. Если settings.PROFILING
+выключен, middleware отказывается от работы (MiddlewareNotUsed), и
+запросы не платят за профилирование ничего.
+"""
+import cProfile
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_missing = object()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ))
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_time * 1000, 2),
+            'db_queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current():
+    """Метрики запроса, который обрабатывает текущий поток, или None."""
+    return getattr(_local, 'metrics', None)
+
+
+class ProfiledTemplate:
+    """Шаблон бэкенда, рендер которого учитывается в метриках запроса."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None or metrics.template_depth:
+            # Вложенные шаблоны уже учтены во времени внешнего.
+            return self.template.render(context, request)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.template_depth -= 1
+
+
+class ProfilingTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, который считает время рендера запроса."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name))
+
+
+class ProfilingCache(BaseCache):
+    """
+    Обертка над кэшем OPTIONS['CACHE'], которая считает попадания и
+    промахи запроса. Ключи и время жизни обрабатывает оборачиваемый кэш.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.wrapped_alias = params.get('OPTIONS', {})['CACHE']
+
+    @property
+    def wrapped(self):
+        return caches[self.wrapped_alias]
+
+    def count(self, hits, misses):
+        metrics = current()
+        if metrics is not None:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = self.wrapped.get(key, _missing, version=version)
+        if value is _missing:
+            self.count(0, 1)
+            return default
+        self.count(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.wrapped.get_many(keys, version=version)
+        self.count(len(found), len(keys) - len(found))
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.wrapped.add(key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.wrapped.set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.wrapped.set_many(data, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.wrapped.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self.wrapped.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        return self.wrapped.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.wrapped.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.wrapped.incr(key, delta, version)
+
+    def clear(self):
+        self.wrapped.clear()
+
+    def close(self, **kwargs):
+        self.wrapped.close(**kwargs)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.counter = itertools.count(1)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        profiler = None
+        if self.sample_rate and next(self.counter) % self.sample_rate == 0:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                if profiler is not None:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            metrics.total_time = time.perf_counter() - started
+            _local.metrics = None
+        response['Server-Timing'] = metrics.server_timing()
+        data = metrics.as_dict()
+        if profiler is not None:
+            data['profile'] = self.dump(profiler, request)
+        logger.info(
+            'method=%s path=%s status=%s %s',
+            request.method, request.path, response.status_code,
+            ' '.join(f'{key}={value}' for key, value in data.items()),
+            extra={'profiling': data},
+        )
+        return response
+
+    def dump(self, profiler, request):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        name = '{}-{}-{}.prof'.format(
+            time.strftime('%Y%m%d-%H%M%S'),
+            request.method,
+            request.path.strip('/').replace('/', '_') or 'index',
+        )
+        path = os.path.join(settings.PROFILING_DIR, name)
+        profiler.dump_stats(path)
+        return path
@@ -0,0 +1,16 @@
+"""
+Код рабочих процессов очереди задач.
+
+Модуль не импортирует модели на верхнем уровне: процессы запускаются
+методом spawn, и Django в них настраивается только в main.
+"""
+import django
+
+
+def main(poll_interval, once):
+    django.setup()
+    from core import tasks
+    try:
+        tasks.work(poll_interval, once)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,167 @@
+"""
+Очередь фоновых задач в базе без внешнего брокера.
+
+Функция-задача регистрируется декоратором @task, а func.delay(*args,
+**kwargs) добавляет строку core.Task в текущей транзакции: задача
+появляется в очереди, только если зафиксирована запись, которая ее
+породила. Аргументы сериализуются в JSON, поэтому в задачу передаются
+id объектов, а не сами объекты.
+
+Задачи выполняет manage.py run_tasks. Рабочий процесс короткой
+транзакцией занимает до TASKS_BATCH_SIZE готовых задач по убыванию
+приоритета: UPDATE ... WHERE записывает в них владельца и срок
+claimed_until, и задачу, которую успел занять другой процесс, UPDATE
+просто не затронет. Затем каждая задача выполняется в своей транзакции,
+вместе с которой удаляется ее строка, поэтому выполненная задача
+(и, например, отправленное ею письмо) не повторяется из-за ошибки в
+соседней. Если процесс упадет посреди задачи, после TASKS_CLAIM_TIMEOUT
+секунд ее займет другой процесс, поэтому задачи должны быть
+идемпотентными. Упавшая задача повторяется через
+TASKS_RETRY_DELAY * 2 ** (попытка - 1) секунд, после max_attempts попыток
+остается в таблице в состоянии failed.
+
+С settings.TASKS_EAGER задачи выполняются сразу при постановке.
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .metrics import REGISTRY, TASK_LAG_SECONDS, TASK_SECONDS, TASKS_TOTAL
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(priority=0, max_attempts=3):
+    """Регистрирует функцию как фоновую задачу и добавляет ей delay()."""
+    def decorator(func):
+        name = f'{func.__module__}.{func.__name__}'
+        func.task_name = name
+        func.priority = priority
+        func.max_attempts = max_attempts
+        func.delay = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, *args, **kwargs):
+    if settings.TASKS_EAGER:
+        func(*args, **kwargs)
+        return None
+    return Task.objects.create(
+        name=func.task_name,
+        payload=json.dumps([args, kwargs]),
+        priority=func.priority,
+    )
+
+
+def _retry(task, func, error):
+    task.attempts += 1
+    task.last_error = ''.join(traceback.format_exception(
+        type(error), error, error.__traceback__
+    ))
+    max_attempts = func.max_attempts if func else 1
+    if task.attempts >= max_attempts:
+        task.status = Task.FAILED
+        result = 'failed'
+    else:
+        task.run_at = timezone.now() + timedelta(
+            seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+        )
+        result = 'retry'
+    task.owner, task.claimed_until = '', None
+    task.save(update_fields=(
+        'attempts', 'last_error', 'status', 'run_at', 'owner',
+        'claimed_until',
+    ))
+    logger.error(
+        'Задача %s завершилась ошибкой (%s)', task, result, exc_info=error
+    )
+    return result
+
+
+def _run(task):
+    """Выполняет задачу в отдельной транзакции; True, если успешно."""
+    func = registry.get(task.name)
+    TASK_LAG_SECONDS.observe(
+        (timezone.now() - task.run_at).total_seconds(), task=task.name
+    )
+    started = time.perf_counter()
+    try:
+        if func is None:
+            raise LookupError(f'Задача {task.name} не зарегистрирована')
+        args, kwargs = json.loads(task.payload)
+        # Строка удаляется последней: SQLite берет блокировку записи на
+        # первом изменении, и задача без записей в базу (отправка письма)
+        # держит ее только на время удаления.
+        with transaction.atomic():
+            func(*args, **kwargs)
+            Task.objects.filter(pk=task.pk).delete()
+    except Exception as error:
+        with transaction.atomic():
+            result = _retry(task, func, error)
+    else:
+        result = 'done'
+    TASK_SECONDS.observe(time.perf_counter() - started, task=task.name)
+    TASKS_TOTAL.inc(task=task.name, result=result)
+    return result == 'done'
+
+
+def new_owner():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim(owner):
+    """Занимает пачку готовых задач за owner и возвращает их."""
+    now = timezone.now()
+    free = Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    with transaction.atomic():
+        ready = list(Task.objects.filter(
+            free, status=Task.QUEUED, run_at__lte=now,
+        ).order_by('-priority', 'run_at', 'id').values_list(
+            'pk', flat=True
+        )[:settings.TASKS_BATCH_SIZE])
+        # Задачи, которые успел занять другой процесс, условие free
+        # уже не пропустит.
+        Task.objects.filter(free, pk__in=ready).update(
+            owner=owner,
+            claimed_until=now + timedelta(
+                seconds=settings.TASKS_CLAIM_TIMEOUT
+            ),
+        )
+    return list(Task.objects.filter(pk__in=ready, owner=owner).order_by(
+        '-priority', 'run_at', 'id'
+    ))
+
+
+def run_batch(owner=None):
+    """Выполняет одну пачку готовых задач и возвращает ее размер."""
+    batch = claim(owner or new_owner())
+    for task in batch:
+        _run(task)
+    return len(batch)
+
+
+def work(poll_interval, once=False):
+    """Цикл рабочего процесса; с once завершается на пустой очереди."""
+    owner = new_owner()
+    while True:
+        count = run_batch(owner)
+        REGISTRY.flush()
+        if not count:
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,52 @@
+"""
+Тег {% cache %}, который считает попадания и промахи кэша фрагментов.
+
+Работает так же, как встроенный тег из django.templatetags.cache, и
+пишет результат каждого обращения в метрику yatube_fragment_cache_total.
+"""
+from django import template
+from django.template import NodeList
+from django.templatetags import cache
+
+from core.metrics import FRAGMENT_CACHE
+
+register = template.Library()
+
+
+class MissRecordingNodeList(NodeList):
+    """Содержимое фрагмента: рендерится только при промахе кэша."""
+
+    def __init__(self, nodes, owner):
+        super().__init__(nodes)
+        self.owner = owner
+
+    def render(self, context):
+        context.render_context[self.owner] = 'miss'
+        return super().render(context)
+
+
+class MeasuredCacheNode(cache.CacheNode):
+    def __init__(self, nodelist, *args, **kwargs):
+        super().__init__(nodelist, *args, **kwargs)
+        self.nodelist = MissRecordingNodeList(nodelist, self)
+
+    def render(self, context):
+        context.render_context[self] = 'hit'
+        value = super().render(context)
+        FRAGMENT_CACHE.inc(
+            fragment=self.fragment_name,
+            result=context.render_context.get(self, 'hit'),
+        )
+        return value
+
+
+@register.tag('cache')
+def do_cache(parser, token):
+    node = cache.do_cache(parser, token)
+    return MeasuredCacheNode(
+        node.nodelist,
+        node.expire_time_var,
+        node.fragment_name,
+        node.vary_on,
+        node.cache_name,
+    )
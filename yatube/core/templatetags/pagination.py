@@ -0,0 +1,17 @@
+from django import template
+
+register = template.Library()
+
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, **params):
+    """Ссылка на страницу с сохранением остальных параметров запроса."""
+    query = context['request'].GET.copy()
+    for name in PAGE_PARAMS:
+        query.pop(name, None)
+    for name, value in params.items():
+        if value:
+            query[name] = value
+    return f'?{query.urlencode()}'
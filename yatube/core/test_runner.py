@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TempCacheRunner(DiscoverRunner):
+    """
+    Запускает тесты с общим кэшем во временном каталоге.
+
+    Иначе тесты читали бы и засоряли файл кэша, которым пользуется
+    сервер разработки.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.cache_settings = override_settings(CACHES={
+            **settings.CACHES,
+            'shared': {
+                **settings.CACHES['shared'],
+                'LOCATION': os.path.join(self.cache_dir, 'cache.sqlite3'),
+            },
+        })
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,114 @@
+"""
+Очередь записи в базу внутри процесса.
+
+SQLite допускает только одного писателя, и каждая короткая транзакция
+платит за свой COMMIT (fsync журнала). execute() передает функцию записи
+одному потоку-писателю, который собирает накопившиеся функции в пачку до
+SQLITE_WRITE_BATCH_SIZE штук и выполняет их в одной транзакции, каждую в
+своей точке сохранения: ошибка одной функции не откатывает остальные.
+Вызывающий поток ждет, пока пачка не будет зафиксирована, и получает
+результат своей функции или ее исключение. Если писатель не взял функцию
+за SQLITE_WRITE_TIMEOUT секунд, она снимается с очереди и выполняется в
+вызывающем потоке; функцию, которую писатель уже выполняет, вызывающий
+поток дожидается без срока, чтобы запись не повторилась.
+
+Если очередь выключена (settings.SQLITE_WRITE_QUEUE) или вызывающий код
+уже находится в транзакции, функция выполняется сразу в текущем потоке:
+запись должна попасть в ту же транзакцию, что и остальные изменения.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_writer = None
+_lock = threading.Lock()
+
+
+def _collect():
+    """
+    Ждет первую функцию и добирает к ней уже поставленные в очередь.
+
+    Пачки не ждут дополнительно: пока фиксируется одна, в очереди
+    накапливается следующая.
+    """
+    batch = [_queue.get()]
+    while len(batch) < settings.SQLITE_WRITE_BATCH_SIZE:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run(batch):
+    # Функции, которые вызывающий поток уже снял с очереди, пропускаются.
+    batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+    results = []
+    try:
+        with transaction.atomic():
+            for future, func, args, kwargs in batch:
+                try:
+                    with transaction.atomic():
+                        results.append((future, func(*args, **kwargs), None))
+                except Exception as error:
+                    results.append((future, None, error))
+    except Exception as error:
+        # Не удалось зафиксировать пачку: ошибка достается всем.
+        for future, *_ in batch:
+            future.set_exception(error)
+        return
+    for future, result, error in results:
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+
+def _work():
+    while True:
+        batch = _collect()
+        try:
+            _run(batch)
+        except Exception:
+            logger.exception('Сбой потока записи')
+        finally:
+            if not connection.is_usable():
+                connection.close()
+
+
+def _get_writer():
+    global _writer
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=_work, name='sqlite-writer', daemon=True
+            )
+            _writer.start()
+        return _writer
+
+
+def execute(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в общей транзакции записи."""
+    if not settings.SQLITE_WRITE_QUEUE or connection.in_atomic_block:
+        with transaction.atomic():
+            return func(*args, **kwargs)
+    future = Future()
+    _get_writer()
+    _queue.put((future, func, args, kwargs))
+    try:
+        return future.result(timeout=settings.SQLITE_WRITE_TIMEOUT)
+    except TimeoutError:
+        if not future.cancel():
+            # Писатель уже выполняет функцию: повторять ее нельзя, а
+            # ошибка по сроку не помешала бы записи зафиксироваться.
+            return future.result()
+    logger.warning('Поток записи не ответил, запись выполняется сразу')
+    with transaction.atomic():
+        return func(*args, **kwargs)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from posts import search
 from posts.models import Comment, Follow, Group, Post
 
 
@@ -10,6 +11,13 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(id__in=search.matching_ids(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
@@ -0,0 +1,122 @@
+"""
+JSON API лент index, group_posts и profile для мобильных клиентов.
+
+Посты читаются через .values() только с теми полями, которые запрошены в
+?fields=, без создания экземпляров Post. Пагинация курсорная, как у
+HTML-лент: ссылки next и previous содержат токены after/before. Ответы
+анонимным клиентам кэшируются и получают ETag (anonymous_page_cache).
+"""
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.paginator import paginate
+from core.templatetags.pagination import PAGE_PARAMS
+
+from . import generations
+from .decorators import anonymous_page_cache
+from .models import Group, Post, User
+
+# Имя поля в ответе -> путь для .values().
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'image_color': 'image_color',
+    'comments_count': 'comments_count',
+}
+# Поля ключа курсора читаются всегда.
+KEY_FIELDS = ('pub_date', 'id')
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+CONVERTERS = {
+    'image': image_url,
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value):
+    """Список полей из ?fields=; без параметра отдаются все поля."""
+    if not value:
+        return list(FIELDS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown or not names:
+        raise InvalidFields(', '.join(unknown))
+    return list(dict.fromkeys(names))
+
+
+def page_link(request, **params):
+    query = request.GET.copy()
+    for name in PAGE_PARAMS:
+        query.pop(name, None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def serialize(row, names):
+    item = {}
+    for name in names:
+        value = row[FIELDS[name]]
+        converter = CONVERTERS.get(name)
+        item[name] = converter(value) if converter else value
+    return item
+
+
+def feed_response(request, queryset):
+    try:
+        names = parse_fields(request.GET.get('fields'))
+    except InvalidFields as error:
+        return JsonResponse(
+            {'error': f'Неизвестные поля: {error}'}, status=400
+        )
+    paths = dict.fromkeys(
+        [*KEY_FIELDS, *(FIELDS[name] for name in names)]
+    )
+    page = paginate(request, queryset.values(*paths))
+    return JsonResponse({
+        'results': [serialize(row, names) for row in page],
+        'next': (
+            page_link(request, after=page.next_cursor)
+            if page.has_next() else None
+        ),
+        'previous': (
+            page_link(request, before=page.previous_cursor)
+            if page.has_previous() else None
+        ),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@require_safe
+@anonymous_page_cache(lambda: ['index'])
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@anonymous_page_cache(lambda slug: [generations.group_scope(slug)])
+def group_posts(request, slug):
+    group_id = get_object_or_404(Group.objects.only('id'), slug=slug).id
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+@anonymous_page_cache(lambda username: [generations.author_scope(username)])
+def profile(request, username):
+    author_id = get_object_or_404(
+        User.objects.only('id'), username=username
+    ).id
+    return feed_response(request, Post.objects.filter(author_id=author_id))
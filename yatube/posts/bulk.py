@@ -0,0 +1,79 @@
+"""
+Помощники для массовой загрузки данных в обход сигналов.
+
+bulk_create не отправляет post_save, поэтому после загрузки счетчики,
+ленты подписок и поисковый индекс пересчитываются целиком
+(refresh_derived_data).
+"""
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import call_command
+
+from . import generations, search, timeline
+
+
+def batched(iterable, size):
+    """Делит iterable на списки по size элементов."""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Позволяет сохранить свои значения в полях с auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Progress:
+    """Печатает число обработанных строк и скорость не чаще interval."""
+
+    def __init__(self, stdout, interval=5):
+        self.stdout = stdout
+        self.interval = interval
+        self.started = self.reported = time.monotonic()
+        self.rows = 0
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed else 0
+
+    def add(self, label, rows):
+        self.rows += rows
+        now = time.monotonic()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            self.stdout.write(
+                f'{label}: {self.rows} строк, {self.rate:.0f} строк/с'
+            )
+
+    def done(self):
+        elapsed = time.monotonic() - self.started
+        return (f'{self.rows} строк за {elapsed:.1f} с, '
+                f'{self.rate:.0f} строк/с')
+
+
+def refresh_derived_data(stdout):
+    """Пересчитывает все, что обычно поддерживают сигналы."""
+    call_command('reconcile_counters', stdout=stdout)
+    entries = timeline.rebuild()
+    stdout.write(f'Записей в лентах подписок: {entries}')
+    if search.is_available():
+        indexed = search.rebuild()
+        stdout.write(f'Постов в поисковом индексе: {indexed}')
+    generations.bump('all')
+    stdout.write(
+        f'Лимит fan-out: {settings.TIMELINE_FANOUT_LIMIT} подписчиков'
+    )
@@ -0,0 +1,50 @@
+"""
+Кэш отрендеренных карточек постов для лент.
+
+Ключ карточки включает updated_at и comments_count поста и поколения
+его автора и группы (user:<id> и group-info:<id>), поэтому карточка не
+требует явной инвалидации: измененный пост или переименованный
+автор просто дают новый ключ, а карточки остальных постов остаются
+в кэше. Все карточки страницы читаются из кэша одним get_many,
+рендерятся только недостающие. Кэш общий для index, group_list,
+profile, follow и поиска.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import generations
+
+TEMPLATE = 'includes/post_card.html'
+
+
+def card_scopes(post):
+    scopes = [generations.user_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(generations.group_info_scope(post.group_id))
+    return scopes
+
+
+def card_key(post, tokens):
+    version = post.updated_at.timestamp()
+    generation = '.'.join(tokens[scope] for scope in card_scopes(post))
+    return f'card:{post.pk}:{version}:{post.comments_count}:{generation}'
+
+
+def render_cards(posts):
+    """HTML карточек постов в том же порядке."""
+    tokens = generations.tokens({
+        scope for post in posts for scope in card_scopes(post)
+    })
+    keys = [card_key(post, tokens) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string(TEMPLATE, {'post': post})
+        for key, post in zip(keys, posts)
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,68 @@
+"""
+Денормализованные счетчики постов, комментариев и подписок.
+
+Счетчики обновляются сигналами (см. posts.signals) выражениями F(), то
+есть атомарно на стороне базы, и читаются шаблонами вместо COUNT(*).
+Команда reconcile_counters пересчитывает их, если они разошлись.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserCounters
+
+
+class Counter:
+    """Счетчик field модели target по внешнему ключу fk модели source."""
+
+    def __init__(self, source, fk, target, target_key, field):
+        self.source = source
+        self.fk = fk
+        self.target = target
+        self.target_key = target_key
+        self.field = field
+
+    @property
+    def attname(self):
+        return self.source._meta.get_field(self.fk).attname
+
+    def shift(self, pk, delta):
+        if pk is None:
+            return
+        self.target.objects.filter(**{self.target_key: pk}).update(
+            **{self.field: F(self.field) + delta}
+        )
+
+    def actual(self):
+        """Выражение с фактическим значением счетчика."""
+        rows = self.source.objects.filter(
+            **{self.attname: OuterRef(self.target_key)}
+        ).order_by().values(self.attname).annotate(
+            total=Count('pk')
+        ).values('total')
+        return Coalesce(Subquery(rows), Value(0))
+
+    def reconcile(self):
+        """Пересчитывает счетчик и возвращает число исправленных строк."""
+        drifted = self.target.objects.annotate(
+            actual=self.actual()
+        ).exclude(**{self.field: F('actual')})
+        fixed = drifted.count()
+        if fixed:
+            self.target.objects.update(**{self.field: self.actual()})
+        return fixed
+
+    def __str__(self):
+        return f'{self.target._meta.label}.{self.field}'
+
+
+COUNTERS = (
+    Counter(Post, 'author', UserCounters, 'user_id', 'posts_count'),
+    Counter(Post, 'group', Group, 'pk', 'posts_count'),
+    Counter(Comment, 'post', Post, 'pk', 'comments_count'),
+    Counter(Follow, 'author', UserCounters, 'user_id', 'followers_count'),
+    Counter(Follow, 'user', UserCounters, 'user_id', 'following_count'),
+)
+
+
+def counters_for(model):
+    return [counter for counter in COUNTERS if counter.source is model]
@@ -0,0 +1,68 @@
+import hashlib
+import math
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from . import generations
+
+
+def anonymous_page_cache(scopes):
+    """
+    Кэширует страницу целиком для запросов без сессии.
+
+    scopes(**kwargs) возвращает области posts.generations, от которых
+    зависит страница. Из их поколения строится ETag, а из времени
+    последней смены -- Last-Modified, поэтому повторный запрос с
+    If-None-Match или If-Modified-Since получает 304 без обращения к базе,
+    а тело ответа отдается из кэша, пока поколение не сменится.
+    Запросы с сессионной cookie всегда обрабатываются view и помечаются
+    private.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or settings.SESSION_COOKIE_NAME in request.COOKIES):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                return response
+
+            generation, bumped = generations.get_modified(
+                'all', *scopes(**kwargs)
+            )
+            # HTTP-дата хранит целые секунды: округление вверх не даст
+            # смене в ту же секунду совпасть с прежним Last-Modified.
+            last_modified = math.ceil(bumped)
+            digest = hashlib.md5(
+                f'{generation}:{request.get_full_path()}'.encode()
+            ).hexdigest()
+            etag = quote_etag(digest)
+            # 304 копирует ETag и Last-Modified из переданного ответа.
+            validators = HttpResponse()
+            validators['ETag'] = etag
+            validators['Last-Modified'] = http_date(last_modified)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+                response=validators,
+            )
+            if response is validators:
+                key = f'page:{digest}'
+                response = cache.get(key)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code == 200 and not response.cookies:
+                        response['ETag'] = etag
+                        response['Last-Modified'] = validators['Last-Modified']
+                        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            patch_cache_control(response, public=True, max_age=0,
+                                must_revalidate=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+"""
+Потоковая выгрузка постов и комментариев пользователя.
+
+Строки читаются из базы итераторами по EXPORT_CHUNK_SIZE и сразу
+отдаются клиенту через StreamingHttpResponse, поэтому память процесса
+не зависит от числа постов. Архив zip собирается на лету: zipfile
+пишет в буфер без seek, и после каждой записи накопленные байты
+отдаются клиенту.
+"""
+import csv
+import json
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Comment, Post
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'zip': ('application/zip', 'zip'),
+}
+CSV_COLUMNS = ('type', 'id', 'post_id', 'group', 'date', 'text', 'image')
+IMAGES_DIR = 'images'
+
+
+def rows(user):
+    """Посты, затем комментарии пользователя в виде словарей."""
+    posts = Post.objects.filter(author=user).order_by('pk').values_list(
+        'pk', 'group__slug', 'pub_date', 'text', 'image'
+    )
+    for pk, group, pub_date, text, image in posts.iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'group': group,
+            'date': pub_date.isoformat(),
+            'text': text,
+            'image': image,
+        }
+    comments = Comment.objects.filter(author=user).order_by(
+        'pk'
+    ).values_list('pk', 'post_id', 'created', 'text')
+    for pk, post_id, created, text in comments.iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'post_id': post_id,
+            'date': created.isoformat(),
+            'text': text,
+        }
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(user):
+    writer = csv.DictWriter(Echo(), CSV_COLUMNS)
+    yield writer.writeheader()
+    for row in rows(user):
+        yield writer.writerow(row)
+
+
+def ndjson_stream(user):
+    for row in rows(user):
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class ZipBuffer:
+    """Буфер без seek: zipfile дописывает в него, генератор забирает."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def images(user):
+    names = Post.objects.filter(author=user).exclude(image='').order_by(
+        'pk'
+    ).values_list('image', flat=True)
+    return names.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def zip_stream(user):
+    buffer = ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('data.ndjson', 'w', force_zip64=True) as data:
+            for row in rows(user):
+                data.write(
+                    (json.dumps(row, ensure_ascii=False) + '\n').encode()
+                )
+                yield buffer.pop()
+        for name in images(user):
+            if not default_storage.exists(name):
+                continue
+            info = zipfile.ZipInfo(os.path.join(IMAGES_DIR, name))
+            # Картинки уже сжаты.
+            info.compress_type = zipfile.ZIP_STORED
+            with default_storage.open(name) as source, \
+                    archive.open(info, 'w', force_zip64=True) as target:
+                for chunk in source.chunks():
+                    target.write(chunk)
+                    yield buffer.pop()
+    yield buffer.pop()
+
+
+STREAMS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+    'zip': zip_stream,
+}
@@ -0,0 +1,137 @@
+"""
+RSS- и Atom-ленты: все посты, посты группы и посты автора.
+
+Ленты отдаются через anonymous_page_cache: XML хранится в кэше, пока не
+сменится поколение области ленты (posts.generations), а ETag и
+Last-Modified по времени его смены позволяют читалкам получать 304.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import require_safe
+
+from . import generations
+from .decorators import anonymous_page_cache
+from .models import Group, Post, User
+
+TITLE_WORDS = 10
+
+
+class PostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Последние обновления на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.select_related(
+            'author', 'group'
+        )[:settings.SYNDICATION_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.id})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        return reverse(
+            'posts:profile', kwargs={'username': item.author.username}
+        )
+
+    def item_categories(self, item):
+        return (item.group.title,) if item.group else ()
+
+
+class PostsAtomFeed(PostsFeed):
+    feed_type = Atom1Feed
+    subtitle = PostsFeed.description
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', kwargs={'slug': group.slug})
+
+    def items(self, group):
+        return group.posts.select_related(
+            'author', 'group'
+        )[:settings.SYNDICATION_ITEMS]
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, group):
+        return group.description
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def items(self, author):
+        return author.posts.select_related(
+            'author', 'group'
+        )[:settings.SYNDICATION_ITEMS]
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, author):
+        return self.description(author)
+
+
+def cached_feed(feed, scopes):
+    return require_safe(anonymous_page_cache(scopes)(feed))
+
+
+def index_scopes():
+    return ['index']
+
+
+def group_scopes(slug):
+    return [generations.group_scope(slug)]
+
+
+def author_scopes(username):
+    return [generations.author_scope(username)]
+
+
+index_rss = cached_feed(PostsFeed(), index_scopes)
+index_atom = cached_feed(PostsAtomFeed(), index_scopes)
+group_rss = cached_feed(GroupFeed(), group_scopes)
+group_atom = cached_feed(GroupAtomFeed(), group_scopes)
+author_rss = cached_feed(AuthorFeed(), author_scopes)
+author_atom = cached_feed(AuthorAtomFeed(), author_scopes)
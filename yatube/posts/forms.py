@@ -1,6 +1,10 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Comment, Post
+from core.metrics import UPLOAD_BYTES
+
+from . import images
+from .models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
@@ -9,9 +13,50 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            UPLOAD_BYTES.observe(image.size)
+            image, size, color = images.normalize(image)
+            self.instance.image_width, self.instance.image_height = size
+            self.instance.image_color = color
+            self.instance.thumbnail_names = ''
+        elif not image:
+            self.instance.image_width = self.instance.image_height = None
+            self.instance.image_color = ''
+            self.instance.thumbnail_names = ''
+        return image
+
 
 class CommentForm(forms.ModelForm):
 
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label='Запрос',
+        max_length=200,
+    )
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+    )
+    author = forms.CharField(
+        label='Автор',
+        max_length=150,
+        required=False,
+    )
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise forms.ValidationError('Такого автора нет')
+        return author
@@ -0,0 +1,162 @@
+"""
+Поколения кэша лент.
+
+Каждой области (scope) соответствует случайный токен в кэше. Ключи
+фрагментов включают токены своих областей, поэтому фрагменты можно
+хранить долго: при изменении данных токен области меняется (bump), и
+старые фрагменты просто перестают запрашиваться.
+
+Токены меняются только после фиксации транзакции, в которой изменились
+данные: иначе параллельный запрос успел бы получить новый токен, прочитать
+еще не зафиксированные (то есть старые) данные и закэшировать их под
+новым токеном.
+
+Рядом с токеном хранится время смены. Если область изменилась после
+последнего обновления реплик (core.db_router.mark_replicated), реплика
+может еще не содержать изменения, и запрос читает основную базу: иначе
+под новым токеном закэшировалась бы старая страница.
+
+Области:
+    all             -- все ленты (группы, имена пользователей);
+    index           -- главная страница;
+    group:<slug>    -- лента группы;
+    author:<name>   -- лента автора;
+    follow:<id>     -- подписки пользователя и разложенные по его ленте
+                       посты прежних авторов (новые посты автора
+                       меняют ленту подписок через author:<name>);
+    post:<id>       -- страница поста;
+    user:<id>       -- имя пользователя в карточках его постов;
+    group-info:<id> -- адрес группы в карточках ее постов.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import db_router
+
+from .models import Group
+
+KEY_PREFIX = 'generation'
+
+
+def _key(scope):
+    return f'{KEY_PREFIX}:{scope}'
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def _values(scopes):
+    """Токены областей со временем смены: {область: (токен, время)}."""
+    keys = {scope: _key(scope) for scope in scopes}
+    wanted = list(keys.values())
+    if settings.DATABASE_REPLICAS:
+        wanted.append(db_router.REPLICATED_KEY)
+    values = cache.get_many(wanted)
+    replicated = values.pop(db_router.REPLICATED_KEY, 0)
+    # Потерянный токен считается только что смененным.
+    missing = {
+        key: _new_value() for key in keys.values() if key not in values
+    }
+    if missing:
+        cache.set_many(missing, timeout=None)
+        values.update(missing)
+    if settings.DATABASE_REPLICAS and values:
+        bumped = max(bumped for _, bumped in values.values())
+        if bumped > replicated:
+            db_router.read_primary()
+    return {scope: values[key] for scope, key in keys.items()}
+
+
+def tokens(scopes):
+    """Токены поколений областей: {область: токен}."""
+    return {scope: token for scope, (token, _) in _values(scopes).items()}
+
+
+def get(*scopes):
+    """Возвращает общий токен поколения для набора областей."""
+    found = tokens(scopes)
+    return '.'.join(found[scope] for scope in scopes)
+
+
+def get_modified(*scopes):
+    """Общий токен поколения и время последней смены любой из областей."""
+    found = _values(scopes)
+    return (
+        '.'.join(found[scope][0] for scope in scopes),
+        max(bumped for _, bumped in found.values()),
+    )
+
+
+def _new_value():
+    return _new_token(), time.time()
+
+
+def _set_tokens(scopes):
+    value = _new_value()
+    cache.set_many({_key(scope): value for scope in scopes}, timeout=None)
+
+
+def bump(*scopes):
+    """Инвалидирует все фрагменты, зависящие от областей, после фиксации."""
+    transaction.on_commit(lambda: _set_tokens(scopes))
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def group_info_scope(group_id):
+    return f'group-info:{group_id}'
+
+
+def feed_cache(*scopes):
+    """Параметры тега {% cache %} для ленты из областей scopes."""
+    return {
+        'timeout': settings.FEED_CACHE_TIMEOUT,
+        'generation': get('all', *scopes),
+    }
+
+
+def post_scopes(post):
+    """Области кэша, в которых показывается пост."""
+    scopes = [
+        'index',
+        post_scope(post.pk),
+        author_scope(post.author.username),
+    ]
+    group_ids = {post.group_id}
+    previous = getattr(post, '_previous_keys', None)
+    if previous:
+        group_ids.add(previous['group_id'])
+    group_ids.discard(None)
+    if group_ids:
+        slugs = Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True)
+        scopes.extend(group_scope(slug) for slug in slugs)
+    return scopes
+
+
+def bump_post(post):
+    bump(*post_scopes(post))
@@ -0,0 +1,87 @@
+"""
+Нормализация картинок постов при загрузке.
+
+Картинка декодируется один раз: поворачивается по EXIF, уменьшается до
+settings.POST_IMAGE_MAX_SIZE по большей стороне и кодируется заново без
+метаданных. Заодно вычисляется преобладающий цвет, которым шаблоны
+закрашивают место под картинкой, пока готовятся миниатюры.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, которые сохраняются как есть (прозрачность, палитра);
+# остальное кодируется в JPEG.
+KEEP_FORMATS = ('PNG', 'GIF')
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+}
+
+
+def dominant_color(image):
+    """Самый частый цвет уменьшенной копии картинки в виде #rrggbb."""
+    sample = image.convert('RGB')
+    sample.thumbnail((64, 64))
+    quantized = sample.quantize(colors=8)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def _encode(image, image_format):
+    params = {}
+    if image.info.get('icc_profile'):
+        # Профиль нужен для правильной цветопередачи, остальные
+        # метаданные (EXIF, GPS, комментарии) отбрасываются.
+        params['icc_profile'] = image.info['icc_profile']
+    if image_format == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        params.update(quality=settings.POST_IMAGE_QUALITY, optimize=True,
+                      progressive=True)
+    else:
+        params['optimize'] = True
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+def normalize(uploaded):
+    """
+    Возвращает нормализованный файл, его размеры (ширина, высота) и
+    преобладающий цвет картинки.
+
+    Анимированные GIF не перекодируются, чтобы не потерять кадры.
+    """
+    uploaded.seek(0)
+    with Image.open(uploaded) as image:
+        if getattr(image, 'is_animated', False):
+            color = dominant_color(image)
+            uploaded.seek(0)
+            return uploaded, image.size, color
+        image_format = (
+            image.format if image.format in KEEP_FORMATS else 'JPEG'
+        )
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        max_size = settings.POST_IMAGE_MAX_SIZE
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if icc_profile:
+            image.info['icc_profile'] = icc_profile
+        size = image.size
+        color = dominant_color(image)
+        data = _encode(image, image_format)
+    root, _ = os.path.splitext(os.path.basename(uploaded.name))
+    normalized = SimpleUploadedFile(
+        f'{root}.{EXTENSIONS[image_format]}',
+        data,
+        content_type=CONTENT_TYPES[image_format],
+    )
+    return normalized, size, color
@@ -0,0 +1,262 @@
+import io
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.paginator import CursorPaginator
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку и число запросов к базе страниц index, '
+        'group_posts, profile, post_detail и follow_index и тех же лент '
+        'в JSON API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько раз запросить каждую страницу.',
+        )
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--mode', choices=('client', 'wsgi'), default='client',
+            help='Тестовый клиент Django или WSGI-приложение напрямую.',
+        )
+        parser.add_argument(
+            '--cache', choices=('cold', 'warm'), default='cold',
+            help='cold очищает кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--pages', choices=('html', 'api', 'all'), default='all',
+            help='HTML-страницы, ленты JSON API или и то, и другое.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON.',
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.',
+        )
+
+    def targets(self):
+        """Самые тяжелые экземпляры каждой страницы."""
+        group = Group.objects.order_by('-posts_count').first()
+        author = User.objects.order_by('-counters__followers_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        reader = Follow.objects.values('user_id').annotate(
+            total=Count('id')
+        ).order_by('-total').values_list('user_id', flat=True).first()
+        if None in (group, author, post, reader):
+            raise CommandError(
+                'В базе нет данных, запустите сначала generate_data'
+            )
+        index_url = reverse('posts:index')
+        # Контекст шаблона у тестового клиента есть только в тестах.
+        second_page = CursorPaginator(
+            Post.objects.all(), settings.OBJECTS_PER_PAGE
+        ).first_page()
+        return {
+            'index': (index_url, False),
+            'index_page_2': (
+                f'{index_url}?after={second_page.next_cursor}', False
+            ),
+            'group_posts': (
+                reverse('posts:group_list', kwargs={'slug': group.slug}),
+                False,
+            ),
+            'profile': (
+                reverse('posts:profile',
+                        kwargs={'username': author.username}),
+                False,
+            ),
+            'post_detail': (
+                reverse('posts:post_detail', kwargs={'post_id': post.id}),
+                False,
+            ),
+            'follow_index': (reverse('posts:follow_index'), reader),
+        }
+
+    def api_targets(self):
+        """Те же ленты, что и в targets, в JSON API."""
+        group = Group.objects.order_by('-posts_count').first()
+        author = User.objects.order_by('-counters__followers_count').first()
+        if None in (group, author):
+            raise CommandError(
+                'В базе нет данных, запустите сначала generate_data'
+            )
+        index_url = reverse('posts:api_index')
+        second_page = self.anonymous.get(index_url).json()['next']
+        return {
+            'api_index': (index_url, False),
+            'api_index_page_2': (second_page, False),
+            'api_group_posts': (
+                reverse('posts:api_group_list', kwargs={'slug': group.slug}),
+                False,
+            ),
+            'api_profile': (
+                reverse('posts:api_profile',
+                        kwargs={'username': author.username}),
+                False,
+            ),
+        }
+
+    def selected_targets(self, pages):
+        targets = {}
+        if pages in ('html', 'all'):
+            targets.update(self.targets())
+        if pages in ('api', 'all'):
+            targets.update(self.api_targets())
+        return targets
+
+    def client_request(self, url, user_id):
+        client = self.clients[user_id] if user_id else self.anonymous
+        response = client.get(url)
+        return response.status_code
+
+    def wsgi_request(self, url, user_id):
+        parts = urlsplit(url)
+        environ = {
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'wsgi.input': io.BytesIO(),
+        }
+        if user_id:
+            environ['HTTP_COOKIE'] = self.clients[user_id].cookies.output(
+                header='', sep=';'
+            ).strip()
+        setup_testing_defaults(environ)
+        environ['SERVER_NAME'] = 'testserver'
+        environ['HTTP_HOST'] = 'testserver'
+        status = []
+        body = self.application(
+            environ, lambda code, headers, exc_info=None: status.append(code)
+        )
+        for _ in body:
+            pass
+        if hasattr(body, 'close'):
+            body.close()
+        return int(status[0].split()[0])
+
+    def measure(self, url, user_id, options):
+        request = (
+            self.wsgi_request if options['mode'] == 'wsgi'
+            else self.client_request
+        )
+        for _ in range(options['warmup']):
+            request(url, user_id)
+        latencies = []
+        queries = []
+        for _ in range(options['requests']):
+            if options['cache'] == 'cold':
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                status = request(url, user_id)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                raise CommandError(f'{url} вернул {status}')
+            queries.append(len(captured))
+        return {
+            'url': url,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.mean(latencies), 3),
+            'queries': max(queries),
+        }
+
+    def dataset(self):
+        return {
+            'users': User.objects.count(),
+            'groups': Group.objects.count(),
+            'posts': Post.objects.count(),
+            'follows': Follow.objects.count(),
+            'comments': Comment.objects.count(),
+        }
+
+    def handle(self, *args, **options):
+        # Общий кэш переживает процесс: замеры начинаются с пустого кэша.
+        cache.clear()
+        self.anonymous = Client()
+        self.application = get_wsgi_application()
+        targets = self.selected_targets(options['pages'])
+        self.clients = {}
+        for _, user_id in targets.values():
+            if user_id:
+                client = Client()
+                client.force_login(User.objects.get(pk=user_id))
+                self.clients[user_id] = client
+
+        results = {}
+        for name, (url, user_id) in targets.items():
+            results[name] = self.measure(url, user_id, options)
+            self.report(name, results[name])
+        run = {
+            'started': timezone.now().isoformat(),
+            'options': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'mode', 'cache', 'pages')
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'platform': sys.platform,
+            },
+            'dataset': self.dataset(),
+            'results': results,
+        }
+        if options['compare']:
+            self.compare(options['compare'], results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(run, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<18} p50 {result["p50_ms"]:8.2f} мс  '
+            f'p95 {result["p95_ms"]:8.2f} мс  '
+            f'p99 {result["p99_ms"]:8.2f} мс  '
+            f'запросов {result["queries"]:>3}'
+        )
+
+    def compare(self, path, results):
+        with open(path) as file:
+            previous = json.load(file)['results']
+        self.stdout.write(f'Сравнение с {path} (p95):')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]['p95_ms']
+            change = (result['p95_ms'] - before) / before * 100
+            self.stdout.write(
+                f'{name:<18} {before:8.2f} -> {result["p95_ms"]:8.2f} мс '
+                f'({change:+.1f}%), запросов {previous[name]["queries"]} -> '
+                f'{result["queries"]}'
+            )
@@ -0,0 +1,94 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import recommendations
+from posts.bulk import batched
+from posts.models import Recommendation, User
+
+# Сколько id проверять одним запросом (ограничение SQLite на параметры).
+ID_CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «кого почитать» по графу подписок '
+        '(posts.recommendations).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=settings.RECOMMENDATIONS_PER_USER,
+            help='Сколько рекомендаций хранить для пользователя.',
+        )
+        parser.add_argument(
+            '--fanout', type=int, default=30,
+            help='Сколько подписок узла учитывать.',
+        )
+        parser.add_argument(
+            '--sample', type=int, default=10,
+            help='Сколько подписчиков автора учитывать.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Скольким пользователям обновлять рекомендации за '
+                 'одну транзакцию.',
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def existing_users(self, ids):
+        existing = set()
+        for chunk in batched(ids, ID_CHUNK_SIZE):
+            existing.update(User.objects.filter(
+                pk__in=chunk
+            ).values_list('pk', flat=True))
+        return existing
+
+    def save(self, batch):
+        user_ids = [user_id for user_id, _ in batch]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=user_ids).delete()
+            # Граф загружен в начале долгого пересчета: пользователей,
+            # удаленных с тех пор, пропускаем, иначе вставка нарушит
+            # внешний ключ. Проверка идет после удаления, когда
+            # транзакция уже держит блокировку записи.
+            existing = self.existing_users({
+                pk for user_id, top in batch
+                for pk in (user_id, *(author_id for author_id, _ in top))
+            })
+            Recommendation.objects.bulk_create(
+                Recommendation(user_id=user_id, author_id=author_id,
+                               score=score)
+                for user_id, top in batch if user_id in existing
+                for author_id, score in top if author_id in existing
+            )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        following, followers = recommendations.load_graphs()
+        self.stdout.write(
+            f'[{time.perf_counter() - started:7.1f} с] '
+            f'Граф загружен: {len(following.indices)} подписок'
+        )
+        rows = recommendations.compute(
+            following, followers, options['top'],
+            options['fanout'], options['sample'], options['seed'],
+        )
+        users = total = 0
+        batch = list(islice(rows, options['batch_size']))
+        while batch:
+            self.save(batch)
+            users += len(batch)
+            total += sum(len(top) for _, top in batch)
+            batch = list(islice(rows, options['batch_size']))
+        # Подписчики, которые больше ни на кого не подписаны.
+        Recommendation.objects.exclude(
+            user__follower__isnull=False
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'[{time.perf_counter() - started:7.1f} с] '
+            f'Рекомендаций: {total} для {users} польз.'
+        ))
@@ -0,0 +1,134 @@
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from posts import transfer
+from posts.bulk import Progress
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в каталог в формате JSON Lines вместе с картинками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжать data.jsonl.',
+        )
+        parser.add_argument(
+            '--no-media', action='store_true',
+            help='Не копировать картинки постов.',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        self.chunk_size = options['chunk_size']
+        self.copy_media = not options['no_media']
+        self.missing_media = 0
+        os.makedirs(directory, exist_ok=True)
+        self.media_root = os.path.join(directory, transfer.MEDIA_DIR)
+        self.progress = Progress(self.stdout)
+        path = transfer.data_path(directory, options['gzip'])
+        with transfer.open_data(path, 'w') as file:
+            self.write(file, 'Пользователи', self.users())
+            self.write(file, 'Группы', self.groups())
+            self.write(file, 'Посты', self.posts())
+            self.write(file, 'Комментарии', self.comments())
+            self.write(file, 'Подписки', self.follows())
+        if self.missing_media:
+            self.stdout.write(self.style.WARNING(
+                f'Не найдено картинок: {self.missing_media}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено в {path}: {self.progress.done()}'
+        ))
+
+    def write(self, file, label, records):
+        for record in records:
+            file.write(transfer.dumps(record))
+            self.progress.add(label, 1)
+
+    def users(self):
+        rows = User.objects.order_by('pk').values(
+            'username', 'first_name', 'last_name', 'email', 'date_joined'
+        )
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            yield dict(row, model=transfer.USER)
+
+    def groups(self):
+        rows = Group.objects.order_by('pk').values(
+            'slug', 'title', 'description'
+        )
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            yield dict(row, model=transfer.GROUP)
+
+    def follows(self):
+        rows = Follow.objects.order_by('pk').values_list(
+            'user__username', 'author__username'
+        )
+        for user, author in rows.iterator(chunk_size=self.chunk_size):
+            yield {'model': transfer.FOLLOW, 'user': user, 'author': author}
+
+    def chunks(self, rows):
+        """Строки пачками по первичному ключу."""
+        last_pk = 0
+        while True:
+            chunk = list(rows.filter(pk__gt=last_pk)[:self.chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1]['pk']
+            yield from chunk
+
+    def posts(self):
+        posts = Post.objects.order_by('pk').values(
+            'pk', 'text', 'pub_date', 'image', 'image_width', 'image_height',
+            'image_color',
+            author_name=F('author__username'),
+            group_slug=F('group__slug'),
+        )
+        for row in self.chunks(posts):
+            if row['image'] and self.copy_media:
+                self.copy_image(row['image'])
+            yield {
+                'model': transfer.POST,
+                'id': row['pk'],
+                'author': row['author_name'],
+                'group': row['group_slug'],
+                'text': row['text'],
+                'pub_date': row['pub_date'],
+                'image': row['image'],
+                'image_width': row['image_width'],
+                'image_height': row['image_height'],
+                'image_color': row['image_color'],
+            }
+
+    def comments(self):
+        comments = Comment.objects.order_by('pk').values(
+            'pk', 'post_id', 'text', 'created',
+            author_name=F('author__username'),
+        )
+        for row in self.chunks(comments):
+            yield {
+                'model': transfer.COMMENT,
+                'post': row['post_id'],
+                'author': row['author_name'],
+                'text': row['text'],
+                'created': row['created'],
+            }
+
+    def copy_image(self, name):
+        if not default_storage.exists(name):
+            self.missing_media += 1
+            return
+        target = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with default_storage.open(name) as source, \
+                open(target, 'wb') as destination:
+            shutil.copyfileobj(source, destination)
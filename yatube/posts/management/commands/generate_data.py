@@ -0,0 +1,240 @@
+import math
+import random
+import time
+from array import array
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from faker import Faker
+
+from posts.bulk import batched, keep_dates, refresh_derived_data
+from posts.models import Comment, Follow, Group, Post, User
+
+# Сколько разных текстов сгенерировать Faker'ом. Тексты постов и
+# комментариев выбираются из этого набора: Faker слишком медленный,
+# чтобы вызывать его для каждого из миллионов объектов.
+TEXT_POOL_SIZE = 2000
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса распределения Ципфа для count элементов."""
+    return array('d', accumulate(1 / rank ** exponent
+                                 for rank in range(1, count + 1)))
+
+
+def spread(offset):
+    """
+    Псевдослучайная доля [0, 1), которая зависит только от offset:
+    дату поста можно вычислить по его номеру, не читая ее из базы.
+    """
+    return offset * 2654435761 % 2 ** 32 / 2 ** 32
+
+
+class IdRange:
+    """
+    Непрерывный диапазон id, созданных командой.
+
+    Ранг популярности по Ципфу переводится в номер объекта перестановкой
+    rank * step mod count, поэтому популярные объекты разбросаны по
+    диапазону, а списки id в памяти не хранятся.
+    """
+
+    def __init__(self, first, count, skew, rng):
+        self.first = first
+        self.count = count
+        self.rng = rng
+        self.ranks = range(count)
+        self.weights = zipf_weights(count, skew)
+        self.step = rng.randrange(1, count + 1)
+        while math.gcd(self.step, count) != 1:
+            self.step -= 1
+
+    def offset(self, rank):
+        return rank * self.step % self.count
+
+    def popular(self, k):
+        """k номеров объектов с вероятностью по популярности."""
+        ranks = self.rng.choices(self.ranks, cum_weights=self.weights, k=k)
+        return [self.offset(rank) for rank in ranks]
+
+    def any(self):
+        return self.first + self.rng.randrange(self.count)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'подписками и комментариями для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа для популярности авторов и постов.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикаций.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def log(self, message):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'[{elapsed:7.1f} с] {message}')
+
+    def bulk_create(self, model, objects):
+        """Сохраняет objects пачками и возвращает их число."""
+        total = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            total += len(batch)
+        self.log(f'{model._meta.verbose_name_plural}: {total}')
+        return total
+
+    def new_range(self, model, last_id, expected, skew):
+        """Диапазон id объектов, созданных после last_id."""
+        new = model.objects.filter(pk__gt=last_id).aggregate(
+            first=Min('pk'), last=Max('pk'), count=Count('pk')
+        )
+        if (new['count'] != expected
+                or new['last'] - new['first'] + 1 != expected):
+            raise CommandError(
+                f'{model._meta.verbose_name_plural}: id новых строк идут '
+                f'не подряд, в базу пишет другой процесс'
+            )
+        return IdRange(new['first'], expected, skew, self.random)
+
+    def last_id(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        if options['seed'] is not None:
+            self.fake.seed_instance(options['seed'])
+        self.texts = [self.fake.text() for _ in range(TEXT_POOL_SIZE)]
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+
+        # Каждая пачка bulk_create фиксируется отдельно, поэтому база не
+        # заблокирована на все время генерации. Если команда прервется,
+        # созданное останется в базе без пересчитанных счетчиков и лент:
+        # их пересчитывает следующий запуск или reconcile_counters.
+        if not options['users']:
+            raise CommandError('Нужен хотя бы один пользователь')
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'])
+        # Популярные авторы и пишут больше, и читают их чаще.
+        posts = self.create_posts(options['posts'], users, groups)
+        self.create_follows(options['follows'], users)
+        if posts is not None:
+            self.create_comments(options['comments'], users, posts)
+        refresh_derived_data(self.stdout)
+        self.log(self.style.SUCCESS('Данные созданы'))
+
+    def create_users(self, count):
+        last_id = self.last_id(User)
+        self.bulk_create(User, (
+            User(
+                username=f'{self.fake.user_name()}_{last_id + i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password='!',
+            )
+            for i in range(1, count + 1)
+        ))
+        return self.new_range(User, last_id, count, self.skew)
+
+    def create_groups(self, count):
+        last_id = self.last_id(Group)
+        self.bulk_create(Group, (
+            Group(
+                title=self.fake.sentence(nb_words=3)[:200],
+                slug=f'group-{last_id + i}',
+                description=self.fake.paragraph(),
+            )
+            for i in range(1, count + 1)
+        ))
+        return list(Group.objects.filter(
+            pk__gt=last_id
+        ).values_list('pk', flat=True))
+
+    def post_date(self, offset):
+        return self.now - timedelta(seconds=spread(offset) * self.period)
+
+    def create_posts(self, count, users, groups):
+        if not count:
+            return None
+        last_id = self.last_id(Post)
+        # Треть постов публикуется вне групп.
+        group_choices = groups + [None] * (len(groups) // 2 or 1)
+
+        def posts():
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                authors = users.popular(size)
+                for offset, author in enumerate(authors, start):
+                    yield Post(
+                        text=self.random.choice(self.texts),
+                        author_id=users.first + author,
+                        group_id=self.random.choice(group_choices),
+                        pub_date=self.post_date(offset),
+                    )
+
+        with keep_dates(Post._meta.get_field('pub_date')):
+            self.bulk_create(Post, posts())
+        return self.new_range(Post, last_id, count, self.skew)
+
+    def create_follows(self, average, users):
+        def follows():
+            for user in range(users.count):
+                wanted = min(
+                    int(self.random.expovariate(1 / average)),
+                    users.count - 1,
+                )
+                for author in set(users.popular(wanted)):
+                    if author != user:
+                        yield Follow(
+                            user_id=users.first + user,
+                            author_id=users.first + author,
+                        )
+
+        self.bulk_create(Follow, follows())
+
+    def create_comments(self, count, users, posts):
+        # Большинство комментариев собирают несколько популярных постов.
+        def comments():
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                for post in posts.popular(size):
+                    yield Comment(
+                        post_id=posts.first + post,
+                        author_id=users.any(),
+                        text=self.random.choice(self.texts),
+                        created=min(
+                            self.post_date(post) + timedelta(
+                                seconds=self.random.expovariate(1 / 86400)
+                            ),
+                            self.now,
+                        ),
+                    )
+
+        with keep_dates(Comment._meta.get_field('created')):
+            self.bulk_create(Comment, comments())
@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import generations, thumbnail_worker, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры всех размеров для картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число процессов (по умолчанию THUMBNAIL_WORKERS, 0 -- в '
+                 'этом процессе).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=16,
+            help='Сколько картинок передавать процессу за раз.',
+        )
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        started = time.monotonic()
+        done = 0
+        with thumbnails.create_executor(options['workers']) as executor:
+            results = executor.map(
+                thumbnail_worker.generate,
+                images.iterator(),
+                chunksize=options['chunk_size'],
+            )
+            for image_name, names in results:
+                Post.objects.filter(image=image_name).update(
+                    thumbnail_names=json.dumps(names),
+                    updated_at=timezone.now(),
+                )
+                done += 1
+                if done % 100 == 0:
+                    self.stdout.write(f'Обработано картинок: {done}')
+        generations.bump('all')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы для {done} картинок за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,183 @@
+import os
+from itertools import groupby
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from posts import transfer
+from posts.bulk import Progress, batched, keep_dates, refresh_derived_data
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает каталог, созданный export_data, пачками через '
+        'bulk_create, назначая объектам новые первичные ключи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        try:
+            path = transfer.find_data(directory)
+        except FileNotFoundError as error:
+            raise CommandError(f'Нет файла выгрузки {error}')
+        self.media_root = os.path.join(directory, transfer.MEDIA_DIR)
+        self.progress = Progress(self.stdout)
+        # id поста в выгрузке -> id загруженного поста.
+        self.post_ids = {}
+        handlers = {
+            transfer.USER: self.import_users,
+            transfer.GROUP: self.import_groups,
+            transfer.POST: self.import_posts,
+            transfer.COMMENT: self.import_comments,
+            transfer.FOLLOW: self.import_follows,
+        }
+        # Первичные ключи новых постов вычисляются по максимальному ключу
+        # до вставки, поэтому вся загрузка идет в одной транзакции.
+        with transaction.atomic(), transfer.open_data(path, 'r') as file:
+            records = transfer.read_records(file)
+            for model, group in groupby(records, key=lambda r: r['model']):
+                if model not in handlers:
+                    raise CommandError(f'Неизвестный тип записи {model}')
+                for batch in batched(group, options['batch_size']):
+                    handlers[model](batch)
+            refresh_derived_data(self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {self.progress.done()}'
+        ))
+
+    def user_ids(self, users):
+        """
+        Возвращает {username: id}, создавая недостающих пользователей.
+
+        users -- словарь username -> поля нового пользователя.
+        """
+        ids = dict(User.objects.filter(
+            username__in=users
+        ).values_list('username', 'pk'))
+        missing = [name for name in users if name not in ids]
+        if missing:
+            # Пароли не переносятся: пользователи восстанавливают их.
+            User.objects.bulk_create(
+                User(username=name, password='!', **users[name])
+                for name in missing
+            )
+            ids.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+        return ids
+
+    def import_users(self, records):
+        self.user_ids({
+            record['username']: {
+                'first_name': record['first_name'],
+                'last_name': record['last_name'],
+                'email': record['email'],
+                'date_joined': parse_datetime(record['date_joined']),
+            }
+            for record in records
+        })
+        self.progress.add('Пользователи', len(records))
+
+    def import_groups(self, records):
+        existing = set(Group.objects.filter(
+            slug__in=[record['slug'] for record in records]
+        ).values_list('slug', flat=True))
+        Group.objects.bulk_create(
+            Group(
+                slug=record['slug'],
+                title=record['title'],
+                description=record['description'],
+            )
+            for record in records
+            if record['slug'] not in existing
+        )
+        self.progress.add('Группы', len(records))
+
+    def import_follows(self, records):
+        users = self.user_ids({
+            name: {}
+            for record in records
+            for name in (record['user'], record['author'])
+        })
+        Follow.objects.bulk_create(
+            (
+                Follow(
+                    user_id=users[record['user']],
+                    author_id=users[record['author']],
+                )
+                for record in records
+                if record['user'] != record['author']
+            ),
+            ignore_conflicts=True,
+        )
+        self.progress.add('Подписки', len(records))
+
+    def import_image(self, name):
+        """Копирует картинку в хранилище и возвращает ее новое имя."""
+        source = os.path.join(self.media_root, name)
+        if not name or not os.path.exists(source):
+            return name
+        with open(source, 'rb') as file:
+            return default_storage.save(name, File(file))
+
+    def create_posts(self, posts):
+        """bulk_create, после которого у постов есть первичные ключи."""
+        if connection.features.can_return_ids_from_bulk_insert:
+            return Post.objects.bulk_create(posts)
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        Post.objects.bulk_create(posts)
+        new_pks = Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True)
+        for post, pk in zip(posts, new_pks):
+            post.pk = pk
+        return posts
+
+    def import_posts(self, records):
+        users = self.user_ids({record['author']: {} for record in records})
+        groups = dict(Group.objects.filter(
+            slug__in={record['group'] for record in records}
+        ).values_list('slug', 'pk'))
+        posts = [
+            Post(
+                author_id=users[record['author']],
+                group_id=groups.get(record['group']),
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                image=self.import_image(record['image']),
+                image_width=record['image_width'],
+                image_height=record['image_height'],
+                image_color=record['image_color'],
+            )
+            for record in records
+        ]
+        with keep_dates(Post._meta.get_field('pub_date')):
+            posts = self.create_posts(posts)
+        for post, record in zip(posts, records):
+            self.post_ids[record['id']] = post.pk
+        self.progress.add('Посты', len(records))
+
+    def import_comments(self, records):
+        users = self.user_ids({record['author']: {} for record in records})
+        with keep_dates(Comment._meta.get_field('created')):
+            Comment.objects.bulk_create(
+                Comment(
+                    post_id=self.post_ids[record['post']],
+                    author_id=users[record['author']],
+                    text=record['text'],
+                    created=parse_datetime(record['created']),
+                )
+                for record in records
+                if record['post'] in self.post_ids
+            )
+        self.progress.add('Комментарии', len(records))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.bulk import batched
+from posts.counters import COUNTERS
+from posts.models import User, UserCounters
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики постов и подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            missing = User.objects.filter(
+                counters__isnull=True
+            ).values_list('pk', flat=True)
+            created = 0
+            # bulk_create превращает объекты в список, поэтому пачки
+            # собираются здесь, а размер запроса bulk_create выбирает сам
+            # по ограничениям базы.
+            for batch in batched(missing.iterator(), BATCH_SIZE):
+                UserCounters.objects.bulk_create(
+                    UserCounters(user_id=pk) for pk in batch
+                )
+                created += len(batch)
+            if created:
+                self.stdout.write(f'Созданы счетчики для {created} польз.')
+            for counter in COUNTERS:
+                fixed = counter.reconcile()
+                self.stdout.write(f'{counter}: исправлено строк {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счетчики сверены'))
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    pull_authors = set(
+        Follow.objects.values('author_id').annotate(
+            total=Count('id')
+        ).filter(
+            total__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('author_id', flat=True)
+    )
+    follows = Follow.objects.exclude(author_id__in=pull_authors)
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        posts = Post.objects.filter(
+            author_id=author_id
+        ).values_list('id', 'pub_date')
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for post_id, pub_date in posts.iterator()
+            ),
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_auto_20261018_1639'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, fk, target_key):
+    rows = model.objects.filter(
+        **{fk: OuterRef(target_key)}
+    ).order_by().values(fk).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    app_label, model_name = settings.AUTH_USER_MODEL.split('.')
+    User = apps.get_model(app_label, model_name)
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters.objects.bulk_create(
+        (UserCounters(user_id=pk)
+         for pk in User.objects.values_list('pk', flat=True)),
+        batch_size=500,
+    )
+    UserCounters.objects.update(
+        posts_count=count_of(Post, 'author_id', 'user_id'),
+        followers_count=count_of(Follow, 'author_id', 'user_id'),
+        following_count=count_of(Follow, 'user_id', 'user_id'),
+    )
+    Group.objects.update(posts_count=count_of(Post, 'group_id', 'pk'))
+    Post.objects.update(comments_count=count_of(Comment, 'post_id', 'pk'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_auto_20261018_1639'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
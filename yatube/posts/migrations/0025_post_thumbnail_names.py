@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_names',
+            field=models.TextField(blank=True, editable=False, help_text='JSON: размер -> имя файла миниатюры', verbose_name='Готовые миниатюры'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_image_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.exclude(image='').filter(
+        image_width__isnull=True
+    ).values_list('id', 'image')
+    for post_id, name in posts.iterator():
+        # Пропавший или битый файл оставляет размеры пустыми.
+        try:
+            with default_storage.open(name) as file, Image.open(file) as image:
+                width, height = image.size
+        except (OSError, SyntaxError):
+            continue
+        Post.objects.filter(pk=post_id).update(
+            image_width=width, image_height=height
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_post_thumbnail_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_image_dimensions, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,40 @@
+import threading
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
 User = get_user_model()
 
+# Посты, которые удаляются прямо сейчас в этом потоке. Их комментарии
+# удаляются каскадно, и обновлять для каждого из них счетчик и кэш
+# поста незачем (posts.signals).
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@contextmanager
+def mark_deleting(pks):
+    """Отмечает посты удаляемыми; отметка снимается и при ошибке."""
+    posts = deleting_posts()
+    marked = set(pks) - posts
+    posts.update(marked)
+    try:
+        yield
+    finally:
+        posts.difference_update(marked)
+
+
+class PostQuerySet(models.QuerySet):
+    def delete(self):
+        with mark_deleting(self.values_list('pk', flat=True)):
+            return super().delete()
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -31,17 +63,72 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        blank=True,
+    )
+    # Размеры заполняет PostForm: с width_field/height_field Django
+    # открывал бы файл картинки при каждой загрузке поста без размеров.
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_color = models.CharField(
+        verbose_name='Преобладающий цвет картинки',
+        max_length=7,
+        blank=True,
+        editable=False,
     )
+    thumbnail_names = models.TextField(
+        verbose_name='Готовые миниатюры',
+        help_text='JSON: размер -> имя файла миниатюры',
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self) -> str:
         return str(self.text[:15])
 
+    def delete(self, *args, **kwargs):
+        with mark_deleting([self.pk]):
+            return super().delete(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -52,6 +139,11 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -84,6 +176,13 @@ class Comment(models.Model):
     )
 
     class Meta:
+        ordering = ('created', 'id')
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -116,6 +215,125 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'Подписка {self.user.username} на {self.author.username}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'Пост {self.post_id} в ленте {self.user_id}'
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+    score = models.FloatField(
+        verbose_name='Оценка',
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='recommendation_user_score_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'Автор {self.author_id} для {self.user_id}'
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self) -> str:
+        return f'Счетчики {self.user_id}'
@@ -0,0 +1,175 @@
+"""
+Полнотекстовый поиск по постам.
+
+На SQLite используется таблица FTS5 posts_post_fts (rowid = id поста),
+результаты ранжируются по bm25. Индекс обновляется сигналами при
+сохранении и удалении постов, полная перестройка выполняется командой
+rebuild_search_index. На других СУБД поиск откатывается к icontains.
+"""
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from core.paginator import CursorPaginator, InvalidCursor, decode_cursor
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Превращает пользовательский ввод в запрос FTS5 из фраз."""
+    terms = query.split()
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def index_post(post):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def remove_post(post_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild(batch_size=1000):
+    """Перестраивает индекс целиком и возвращает число постов в нем."""
+    rows = Post.objects.order_by().values_list('pk', 'text')
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                    batch,
+                )
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                batch,
+            )
+            total += len(batch)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return total
+
+
+def matching_ids(query):
+    """Подзапрос с id постов, подходящих под query."""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_expression(query)],
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """
+    Курсорная пагинация результатов поиска по (rank, id).
+
+    Без FTS5 ведет себя как обычная лента, отфильтрованная по icontains.
+    """
+
+    def __init__(self, object_list, per_page, query, group=None,
+                 author=None):
+        if group is not None:
+            object_list = object_list.filter(group=group)
+        if author is not None:
+            object_list = object_list.filter(author=author)
+        self.ranked = is_available()
+        if self.ranked:
+            super().__init__(object_list, per_page, ('rank', 'id'))
+        else:
+            object_list = object_list.filter(text__icontains=query)
+            super().__init__(object_list, per_page)
+        self.query = query
+        self.group = group
+        self.author = author
+
+    @cached_property
+    def count(self):
+        if self.ranked:
+            matching = self.object_list.filter(
+                id__in=matching_ids(self.query)
+            )
+            return matching.count()
+        return super().count
+
+    def key(self, obj):
+        if self.ranked:
+            return obj.search_rank, obj.id
+        return super().key(obj)
+
+    def parse_cursor(self, token):
+        if not self.ranked:
+            return super().parse_cursor(token)
+        values = decode_cursor(token)
+        try:
+            rank, post_id = values
+            return float(rank), int(post_id)
+        except (TypeError, ValueError):
+            raise InvalidCursor(token)
+
+    def search(self, limit, cursor=None, backwards=False, offset=0):
+        conditions = [f'{FTS_TABLE} MATCH %s']
+        params = [match_expression(self.query)]
+        if self.group is not None:
+            conditions.append('post.group_id = %s')
+            params.append(self.group.pk)
+        if self.author is not None:
+            conditions.append('post.author_id = %s')
+            params.append(self.author.pk)
+        sign, order = ('<', 'DESC') if backwards else ('>', 'ASC')
+        if cursor is not None:
+            conditions.append(
+                f'(fts.rank {sign} %s '
+                f'OR (fts.rank = %s AND fts.rowid {sign} %s))'
+            )
+            params.extend([cursor[0], cursor[0], cursor[1]])
+        sql = (
+            f'SELECT fts.rowid, fts.rank FROM {FTS_TABLE} AS fts '
+            f'JOIN {Post._meta.db_table} AS post ON post.id = fts.rowid '
+            f'WHERE {" AND ".join(conditions)} '
+            f'ORDER BY fts.rank {order}, fts.rowid {order} '
+            f'LIMIT %s OFFSET %s'
+        )
+        params.extend([limit, offset])
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            ranks = db_cursor.fetchall()
+        posts = self.object_list.in_bulk([post_id for post_id, _ in ranks])
+        result = []
+        for post_id, rank in ranks:
+            post = posts.get(post_id)
+            if post is not None:
+                post.search_rank = rank
+                result.append(post)
+        return result
+
+    def fetch(self, cursor, backwards, limit):
+        if not self.ranked:
+            return super().fetch(cursor, backwards, limit)
+        return self.search(limit, cursor, backwards)
+
+    def fetch_offset(self, offset, limit):
+        if not self.ranked:
+            return super().fetch_offset(offset, limit)
+        return self.search(limit, offset=offset)
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import generations, search, tasks, thumbnails
+from .counters import counters_for
+from .models import (Comment, Follow, Group, Post, User, UserCounters,
+                     deleting_posts)
+
+COUNTED_MODELS = (Post, Comment, Follow)
+
+
+def deleted_with_post(instance):
+    return (isinstance(instance, Comment)
+            and instance.post_id in deleting_posts())
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, **kwargs):
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+def remember_previous_keys(sender, instance, **kwargs):
+    """Запоминает внешние ключи перед изменением объекта в админке."""
+    if instance._state.adding or instance.pk is None:
+        return
+    counters = counters_for(sender)
+    instance._previous_keys = sender.objects.filter(
+        pk=instance.pk
+    ).values(*(counter.attname for counter in counters)).first()
+
+
+def update_counters_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_keys', None)
+    for counter in counters_for(sender):
+        current = getattr(instance, counter.attname)
+        if created:
+            counter.shift(current, 1)
+        elif previous and previous[counter.attname] != current:
+            counter.shift(previous[counter.attname], -1)
+            counter.shift(current, 1)
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    if deleted_with_post(instance):
+        return
+    for counter in counters_for(sender):
+        counter.shift(getattr(instance, counter.attname), -1)
+
+
+for model in COUNTED_MODELS:
+    pre_save.connect(remember_previous_keys, sender=model)
+    post_save.connect(update_counters_on_save, sender=model)
+    post_delete.connect(update_counters_on_delete, sender=model)
+
+
+@receiver(post_delete, sender=Follow)
+def backfill_former_pull_author(sender, instance, **kwargs):
+    # Отписка опустила число подписчиков до лимита: посты, которые автор
+    # опубликовал, пока читался на лету, раскладываются по лентам.
+    if UserCounters.objects.filter(
+        user_id=instance.author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists():
+        tasks.backfill_author_timelines.delay(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_generations(sender, instance, **kwargs):
+    generations.bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_generations(sender, instance, **kwargs):
+    if deleted_with_post(instance):
+        return
+    post = Post.objects.select_related('author').filter(
+        pk=instance.post_id
+    ).first()
+    if post is not None:
+        generations.bump_post(post)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_generations(sender, instance, **kwargs):
+    generations.bump(
+        generations.follow_scope(instance.user_id),
+        generations.author_scope(instance.author.username),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_generations(sender, instance, **kwargs):
+    generations.bump('all', generations.group_info_scope(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def bump_user_generations(sender, instance, created, update_fields,
+                          **kwargs):
+    # Вход пользователя обновляет только last_login, на ленты это
+    # не влияет.
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    generations.bump('all', generations.user_scope(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_text(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if instance.image and not instance.thumbnail_names:
+        transaction.on_commit(lambda: thumbnails.schedule(instance))
@@ -0,0 +1,34 @@
+"""Фоновые задачи публикации (core.tasks)."""
+from core.tasks import task
+
+from . import generations, timeline
+from .models import Follow, Post, User
+
+
+@task(priority=5)
+def fan_out_post(post_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+        # Ленты подписчиков могли закэшироваться до того, как в них
+        # попал пост: они зависят от области автора.
+        generations.bump(generations.author_scope(post.author.username))
+
+
+@task()
+def backfill_timeline(follow_id):
+    # Подписку могли отменить, пока задача ждала в очереди.
+    follow = Follow.objects.filter(pk=follow_id).first()
+    if follow is not None:
+        timeline.backfill(follow)
+        generations.bump(generations.follow_scope(follow.user_id))
+
+
+@task()
+def backfill_author_timelines(author_id):
+    timeline.backfill_author(author_id)
+    username = User.objects.filter(
+        pk=author_id
+    ).values_list('username', flat=True).first()
+    if username is not None:
+        generations.bump(generations.author_scope(username))
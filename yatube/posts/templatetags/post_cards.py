@@ -0,0 +1,11 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки постов страницы из кэша карточек (posts.cards)."""
+    return cards.render_cards(list(posts))
@@ -0,0 +1,27 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prepared_image(post, name):
+    """
+    Готовая миниатюра name из settings.POST_THUMBNAIL_SIZES со srcset.
+
+    Возвращает None, если у поста нет картинки. Пока миниатюра создается,
+    url равен None, а width и height позволяют зарезервировать место.
+    """
+    if not post.image:
+        return None
+    width, height = thumbnails.get_dimensions(name)
+    url = thumbnails.get_prepared_url(post, name)
+    if url is None:
+        return {'url': None, 'width': width, 'height': height}
+    return {
+        'url': url,
+        'srcset': thumbnails.get_prepared_srcset(post, name),
+        'width': width,
+        'height': height,
+    }
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class CacheFixtures():
+    shared = 'test_shared'
+    key = 'ключ'
+    value = 'значение'
+    new_value = 'новое значение'
+    big_value = 'x' * 100
+    local_max_bytes = 300
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class DbRouterFixtures():
+    replicas = ['replica1']
+    primary = 'default'
+    path = '/'
+    pin_seconds = 10
+    scope = 'db-router-test'
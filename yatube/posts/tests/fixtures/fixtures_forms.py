@@ -1,6 +1,18 @@
+import io
 from dataclasses import dataclass
 
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+
+def make_photo():
+    """Красная JPEG-картинка 3000x1000 с EXIF-поворотом на 90°."""
+    image = Image.new('RGB', (3000, 1000), (200, 0, 0))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
 
 
 @dataclass
@@ -33,3 +45,19 @@ class FormsFixtures():
         'text': 'новый комментарий',
     }
     image_url = 'posts/small.gif'
+    photo = SimpleUploadedFile(
+        name='photo.jpeg',
+        content=make_photo(),
+        content_type='image/jpeg'
+    )
+    form_photo = {
+        'text': 'пост с фотографией',
+        'image': photo,
+    }
+    photo_url = 'posts/photo.jpg'
+    max_size = 500
+    photo_width = 167
+    photo_height = 500
+    photo_color = '#c80000'
+    missing_image = 'posts/missing.jpg'
+    text_missing_image = 'пост с пропавшей картинкой'
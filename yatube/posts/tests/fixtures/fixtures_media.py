@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class MediaFixtures():
+    content = bytes(range(256)) * 4
+    upload_path = 'posts/file.jpg'
+    thumbnail_path = 'cache/ab/cd/file.jpg'
+    media_url = '/media/'
+    range_header = 'bytes=10-19'
+    content_range = 'bytes 10-19/1024'
+    wrong_range = 'bytes=2000-'
+    traversal_url = '/media/../yatube/settings.py'
+    immutable_cache = 'immutable'
+    offload_prefix = '/protected-media/'
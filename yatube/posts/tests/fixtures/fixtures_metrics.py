@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class MetricsFixtures():
+    author = 'Author'
+    text = 'тестовый текст поста'
+    latency = (
+        'yatube_request_duration_seconds_count'
+        '{view="posts:index",method="GET"}'
+    )
+    queries = 'yatube_request_db_queries_count{view="posts:index"}'
+    fragment_hit = (
+        'yatube_fragment_cache_total{fragment="index_page",result="hit"}'
+    )
+    fragment_miss = (
+        'yatube_fragment_cache_total{fragment="index_page",result="miss"}'
+    )
+    other_process = {
+        'yatube_fragment_cache_total': {'["other_page", "hit"]': 5},
+    }
+    other_process_line = (
+        'yatube_fragment_cache_total{fragment="other_page",result="hit"} 5'
+    )
+    foreign_ip = '10.0.0.1'
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ProfilingFixtures():
+    author = 'Author'
+    text = 'тестовый текст поста'
+    timings = ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur=')
+    logger = 'core.profiling'
+    log_fields = ('db_queries=', 'template_ms=', 'cache_misses=')
+    profiled = 'profiled'
+    templates_backend = 'core.profiling.ProfilingTemplates'
+    cache_backend = 'core.profiling.ProfilingCache'
+    no_cache_lookups = 'cache;desc="0 hits, 0 misses"'
+    no_template_time = 'tpl;dur=0.0,'
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class QueryBudgetFixtures():
+    author = 'Author'
+    reader = 'Reader'
+    slug = 'test-slug'
+    # Маленький набор меньше страницы, большой -- больше.
+    small = 2
+    large = 12
+    url_modules = ('posts.urls', 'users.urls', 'about.urls')
+    text = 'тестовый текст'
+    search_query = 'тестовый'
+    password = 'Pass-w0rd-123'
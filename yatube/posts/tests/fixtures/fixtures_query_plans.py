@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class QueryPlansFixtures():
+    author = 'Author'
+    follower = 'Follower'
+    celebrity = 'Celebrity'
+    slug = 'test-slug'
+    posts_count = 15
+    comments_count = 25
+    # Признаки плохого плана в выводе EXPLAIN QUERY PLAN SQLite.
+    temp_b_tree = 'USE TEMP B-TREE'
+    full_scan_prefix = 'SCAN '
+    index_scan_markers = ('USING INDEX', 'USING COVERING INDEX',
+                          'USING INTEGER PRIMARY KEY', 'VIRTUAL TABLE')
+    # Поиск выводит список всех групп в форме и сортирует найденные
+    # посты по рангу bm25, который не хранится в индексе.
+    search_allowed = ('SCAN posts_group', 'USE TEMP B-TREE FOR ORDER BY')
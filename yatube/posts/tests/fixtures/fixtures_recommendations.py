@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class RecommendationsFixtures():
+    reader = 'reader'
+    author = 'author'
+    friend = 'friend'
+    neighbour = 'neighbour'
+    popular = 'popular'
+    seed = 1
+    block_title = 'Кого почитать'
@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class TasksFixtures():
+    author = 'Author'
+    follower = 'Follower'
+    reader = 'Reader'
+    email = 'follower@example.com'
+    password = 'Secret-password-1'
+    reset_path = '/reset/'
+    link_pattern = r'https?://\S+'
+    text = 'тестовый текст поста'
+    fan_out = 'posts.tasks.fan_out_post'
+    flaky = 'posts.tests.test_tasks.flaky'
+    important = 'posts.tests.test_tasks.important'
+    max_attempts = 2
+    owner = 'other-worker'
+    high_priority = 10
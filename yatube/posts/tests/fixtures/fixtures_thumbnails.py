@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ThumbnailsFixtures():
+    username = 'Author'
+    text = 'пост с картинкой'
+    image_name = 'posts/small.gif'
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x01\x00'
+        b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+        b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+        b'\x00\x00\x01\x00\x01\x00\x00\x02'
+        b'\x02\x4c\x01\x00\x3b'
+    )
+    size = 'card'
+    sizes_in_srcset = 3
+    placeholder_width = 960
+    placeholder_height = 339
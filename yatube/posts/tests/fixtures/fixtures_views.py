@@ -14,6 +14,7 @@ class ViewsFixtures():
     title = 'тестовый заголовок'
     description = 'тестовое описание группы'
     text = 'тестовый текст поста номер'
+    changed_text = 'измененный текст поста'
     templates_names = {
         reverse('posts:index'): 'posts/index.html',
         reverse('posts:profile',
@@ -36,9 +37,15 @@ class ViewsFixtures():
         'image': forms.fields.ImageField,
     }
     posts_on_page = 10
+    second_page = 2
     first_post_id = 1
     first_object_in_list = 0
     last_post_id = 13
+    comments_per_page = 5
+    comments_total = 12
+    comment_text = 'комментарий номер'
+    api_fields = 'id,author,image'
+    api_wrong_fields = 'id,password'
     small_gif = (
         b'\x47\x49\x46\x38\x39\x61\x01\x00'
         b'\x01\x00\x00\x00\x00\x21\xf9\x04'
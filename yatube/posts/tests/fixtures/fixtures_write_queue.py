@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class WriteQueueFixtures():
+    threads = 8
+    slug = 'group-{}'
+    title = 'Группа {}'
+    duplicate_slug = 'group-0'
+    timeout = 0.01
@@ -0,0 +1,118 @@
+"""
+Проверка бюджета запросов к базе для view.
+
+QueryRecorder подключается к соединению через execute_wrapper и для
+каждого запроса запоминает тег или переменную шаблона, при рендере
+которых он выполнен. QueryBudgetMixin сравнивает число запросов одной и
+той же страницы на маленьком и большом наборе данных и ищет одинаковые
+запросы внутри одного ответа.
+"""
+import inspect
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import connection
+from django.template.base import TokenType
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    params: str
+    source: str
+
+    def __str__(self):
+        return f'{self.sql}\n    params: {self.params}\n    из: {self.source}'
+
+
+def template_source():
+    """Место в шаблоне, при рендере которого выполняется запрос."""
+    frame = inspect.currentframe()
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if (frame.f_code.co_name == 'render_annotated'
+                and getattr(node, 'token', None) is not None):
+            token = node.token
+            contents = (
+                f'{{{{ {token.contents} }}}}'
+                if token.token_type == TokenType.VAR
+                else f'{{% {token.contents} %}}'
+            )
+            name = getattr(node.origin, 'template_name', node.origin)
+            return f'{name}, строка {token.lineno}: {contents}'
+        frame = frame.f_back
+    return 'код view'
+
+
+class QueryRecorder:
+    """Записывает выполненные запросы вместе с местом в шаблоне."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(
+            RecordedQuery(sql, repr(params), template_source())
+        )
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def duplicates(self):
+        counts = Counter((query.sql, query.params) for query in self.queries)
+        seen = set()
+        result = []
+        for query in self.queries:
+            key = (query.sql, query.params)
+            if counts[key] > 1 and key not in seen:
+                seen.add(key)
+                result.append((counts[key], query))
+        return result
+
+
+def describe(queries):
+    return '\n'.join(f'  {query}' for query in queries)
+
+
+class QueryBudgetMixin:
+    """Проверки для TestCase, которые печатают виновные запросы."""
+
+    def record(self, request):
+        """Выполняет request() и возвращает (ответ, QueryRecorder)."""
+        with QueryRecorder() as recorder:
+            response = request()
+        return response, recorder
+
+    def assertNoDuplicateQueries(self, recorder, label):
+        duplicates = recorder.duplicates()
+        if duplicates:
+            details = '\n'.join(
+                f'  {count} раза: {query}' for count, query in duplicates
+            )
+            self.fail(f'{label}: одинаковые запросы в одном ответе:\n'
+                      f'{details}')
+
+    def assertConstantQueries(self, small, large, label):
+        """Число запросов не зависит от размера данных."""
+        if len(small) == len(large):
+            return
+        small_keys = Counter(query.sql for query in small.queries)
+        extra = []
+        for query in large.queries:
+            if small_keys[query.sql]:
+                small_keys[query.sql] -= 1
+            else:
+                extra.append(query)
+        self.fail(
+            f'{label}: {len(small)} запросов на маленьком наборе данных и '
+            f'{len(large)} на большом. Лишние запросы:\n{describe(extra)}'
+        )
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import TwoTierCache
+from core.metrics import CACHE_LOOKUPS
+from posts.tests.fixtures.fixtures_cache import CacheFixtures
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    CacheFixtures.shared: {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(TEMP_CACHE_DIR, 'cache.sqlite3'),
+    },
+})
+class TwoTierCacheTests(SimpleTestCase):
+    """Два процесса моделируются двумя кэшами с разными уровнями в памяти."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        caches[CacheFixtures.shared].clear()
+
+    def worker(self, name, **options):
+        cache = TwoTierCache(name, {'OPTIONS': {
+            'SHARED': CacheFixtures.shared, **options,
+        }})
+        cache.local.clear()
+        return cache
+
+    def test_invalidation_from_other_process(self):
+        """Запись и удаление в одном процессе видны в другом по штампу."""
+        first = self.worker('first', LOCAL_TIMEOUT=0)
+        second = self.worker('second', LOCAL_TIMEOUT=60)
+        first.set(CacheFixtures.key, CacheFixtures.value)
+        self.assertEqual(second.get(CacheFixtures.key), CacheFixtures.value)
+        second.set(CacheFixtures.key, CacheFixtures.new_value)
+        self.assertEqual(
+            first.get(CacheFixtures.key), CacheFixtures.new_value
+        )
+        second.delete(CacheFixtures.key)
+        self.assertIsNone(first.get(CacheFixtures.key))
+
+    def test_local_tier_bounded_by_size(self):
+        """Старые значения вытесняются из памяти, но остаются в общем."""
+        cache = self.worker(
+            'bounded', LOCAL_MAX_BYTES=CacheFixtures.local_max_bytes
+        )
+        keys = [f'{CacheFixtures.key}{i}' for i in range(5)]
+        cache.set_many({key: CacheFixtures.big_value for key in keys})
+        self.assertLessEqual(cache.local.size, CacheFixtures.local_max_bytes)
+        self.assertNotIn(cache.make_key(keys[0]), cache.local.entries)
+        before = dict(CACHE_LOOKUPS.values)
+        self.assertEqual(
+            cache.get_many(keys),
+            {key: CacheFixtures.big_value for key in keys},
+        )
+        self.assertGreater(
+            CACHE_LOOKUPS.values[('shared', 'hit')],
+            before.get(('shared', 'hit'), 0),
+        )
+        self.assertGreater(
+            CACHE_LOOKUPS.values[('local', 'hit')],
+            before.get(('local', 'hit'), 0),
+        )
+
+    def test_add_and_expiry(self):
+        """add не перезаписывает живое значение, но заменяет истекшее."""
+        cache = self.worker('add')
+        self.assertTrue(cache.add(CacheFixtures.key, CacheFixtures.value))
+        self.assertFalse(
+            cache.add(CacheFixtures.key, CacheFixtures.new_value)
+        )
+        shared = caches[CacheFixtures.shared]
+        shared.set(CacheFixtures.key, CacheFixtures.value, timeout=0)
+        self.assertIsNone(shared.get(CacheFixtures.key))
+        self.assertTrue(
+            shared.add(CacheFixtures.key, CacheFixtures.new_value)
+        )
+        self.assertEqual(
+            shared.get(CacheFixtures.key), CacheFixtures.new_value
+        )
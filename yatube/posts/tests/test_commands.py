@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.tests.fixtures.fixtures_forms import FormsFixtures
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class GenerateDataTests(TestCase):
+    def test_generate_data(self):
+        """generate_data создает данные и согласованные с ними счетчики."""
+        call_command(
+            'generate_data', users=10, groups=2, posts=50, follows=3,
+            comments=40, seed=1, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 40)
+        author = User.objects.order_by('-counters__posts_count').first()
+        self.assertEqual(
+            author.counters.posts_count, author.posts.count(),
+            'Счетчики не пересчитаны после загрузки'
+        )
+        expected_entries = sum(
+            Post.objects.filter(author_id=author_id).count()
+            for author_id in Follow.objects.values_list(
+                'author_id', flat=True
+            )
+        )
+        self.assertEqual(TimelineEntry.objects.count(), expected_entries)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_export_and_import(self):
+        """Выгрузка загружается обратно с комментариями и картинками."""
+        author = User.objects.create_user(username='Author')
+        reader = User.objects.create_user(username='Reader')
+        group = Group.objects.create(
+            title='группа', slug='test-slug', description='описание'
+        )
+        post = Post.objects.create(
+            text='пост с картинкой', author=author, group=group,
+            image=SimpleUploadedFile('small.gif', FormsFixtures.small_gif),
+        )
+        Comment.objects.create(post=post, author=reader, text='комментарий')
+        Follow.objects.create(user=reader, author=author)
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        call_command('export_data', directory, gzip=True, stdout=StringIO())
+        self.assertTrue(os.path.exists(
+            os.path.join(directory, 'media', post.image.name)
+        ))
+
+        for model in (Post, Follow, Group, User):
+            model.objects.all().delete()
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, post.image.name))
+        call_command('import_data', directory, stdout=StringIO())
+
+        imported = Post.objects.get()
+        self.assertEqual(imported.text, post.text)
+        self.assertEqual(imported.pub_date, post.pub_date)
+        self.assertEqual(imported.author.username, author.username)
+        self.assertEqual(imported.group.slug, group.slug)
+        self.assertTrue(imported.image.storage.exists(imported.image.name))
+        comment = imported.comments.get()
+        self.assertEqual(comment.author.username, reader.username)
+        self.assertEqual(imported.comments_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user__username=reader.username, author__username=author.username
+        ).exists())
+        self.assertTrue(TimelineEntry.objects.filter(post=imported).exists())
@@ -0,0 +1,87 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase,
+                         override_settings)
+
+from core import db_router
+from core.db_router import PIN_COOKIE, ReplicaPinMiddleware, use_replica
+from posts import generations
+from posts.models import Post
+from posts.tests.fixtures.fixtures_db_router import DbRouterFixtures
+
+
+@use_replica
+def read_alias(request):
+    return router.db_for_read(Post)
+
+
+@use_replica
+def read_alias_after_generation(request):
+    generations.get(DbRouterFixtures.scope)
+    return router.db_for_read(Post)
+
+
+@override_settings(
+    DATABASE_REPLICAS=DbRouterFixtures.replicas,
+    REPLICA_PIN_SECONDS=DbRouterFixtures.pin_seconds,
+)
+class ReplicaRouterTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        cache.delete(db_router.REPLICATED_KEY)
+
+    def test_read_views_use_replica(self):
+        """Только view с use_replica читают с реплики, запись -- в основную."""
+        request = self.factory.get(DbRouterFixtures.path)
+        self.assertIn(read_alias(request), DbRouterFixtures.replicas)
+        self.assertEqual(
+            router.db_for_read(Post), DbRouterFixtures.primary
+        )
+        self.assertEqual(
+            router.db_for_write(Post), DbRouterFixtures.primary
+        )
+
+    def test_transaction_reads_primary(self):
+        """Внутри транзакции чтение идет в основную базу."""
+        request = self.factory.get(DbRouterFixtures.path)
+        with transaction.atomic():
+            self.assertEqual(read_alias(request), DbRouterFixtures.primary)
+
+    def test_write_pins_to_primary(self):
+        """После изменяющего запроса пользователь читает основную базу."""
+        middleware = ReplicaPinMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.get(DbRouterFixtures.path))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = middleware(self.factory.post(DbRouterFixtures.path))
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], DbRouterFixtures.pin_seconds)
+
+        request = self.factory.get(DbRouterFixtures.path)
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        self.assertEqual(read_alias(request), DbRouterFixtures.primary)
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertIn(read_alias(request), DbRouterFixtures.replicas)
+
+    def test_bump_after_replication_reads_primary(self):
+        """Области, измененные после копирования реплик, читают основную."""
+        request = self.factory.get(DbRouterFixtures.path)
+        generations.bump(DbRouterFixtures.scope)
+        self.assertEqual(
+            read_alias_after_generation(request), DbRouterFixtures.primary
+        )
+        db_router.mark_replicated(time.time())
+        self.assertIn(
+            read_alias_after_generation(request), DbRouterFixtures.replicas
+        )
+        later = time.time() + DbRouterFixtures.pin_seconds + 1
+        with mock.patch('time.time', return_value=later):
+            generations.bump(DbRouterFixtures.scope)
+        self.assertEqual(
+            read_alias_after_generation(request), DbRouterFixtures.primary
+        )
@@ -4,6 +4,7 @@ import tempfile
 from django.conf import settings
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Post, User
 from posts.tests.fixtures.fixtures_forms import FormsFixtures
@@ -50,6 +51,44 @@ class PostsFormsTests(TestCase):
             'Новый пост с картинкой не найден в базе.'
         )
 
+    @override_settings(POST_IMAGE_MAX_SIZE=FormsFixtures.max_size)
+    def test_form_normalizes_image(self):
+        """Картинка поворачивается, уменьшается и теряет EXIF."""
+        PostsFormsTests.authorized_client.post(
+            reverse('posts:post_create'),
+            FormsFixtures.form_photo
+        )
+        post = Post.objects.get(text=FormsFixtures.form_photo['text'])
+        self.assertEqual(post.image.name, FormsFixtures.photo_url)
+        self.assertEqual(
+            (post.image_width, post.image_height),
+            (FormsFixtures.photo_width, FormsFixtures.photo_height),
+            'Размеры картинки не сохранены'
+        )
+        self.assertEqual(post.image_color, FormsFixtures.photo_color)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(
+                image.size,
+                (FormsFixtures.photo_width, FormsFixtures.photo_height)
+            )
+            self.assertFalse(image.getexif(), 'EXIF не удален')
+
+    def test_post_with_missing_image_loads(self):
+        """Пост, файл картинки которого пропал, загружается и выводится."""
+        post = Post.objects.create(
+            text=FormsFixtures.text_missing_image,
+            author=PostsFormsTests.author,
+            image=FormsFixtures.missing_image,
+        )
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).image.name,
+            FormsFixtures.missing_image
+        )
+        response = PostsFormsTests.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, FormsFixtures.text_missing_image)
+
     def test_form_for_edit_post(self):
         """Форма позволяет отредактировать пост."""
         PostsFormsTests.authorized_client.post(
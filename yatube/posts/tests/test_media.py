@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+
+from core import media
+from posts.tests.fixtures.fixtures_media import MediaFixtures
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_OFFLOAD=None)
+class MediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for path in (MediaFixtures.upload_path,
+                     MediaFixtures.thumbnail_path):
+            fullpath = os.path.join(TEMP_MEDIA_ROOT, path)
+            os.makedirs(os.path.dirname(fullpath), exist_ok=True)
+            with open(fullpath, 'wb') as file:
+                file.write(MediaFixtures.content)
+        cls.guest_client = Client()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get(self, path, **extra):
+        return MediaTests.guest_client.get(
+            MediaFixtures.media_url + path, **extra
+        )
+
+    def test_file_served_with_validators(self):
+        """Файл отдается целиком с ETag и Cache-Control."""
+        response = self.get(MediaFixtures.upload_path)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            b''.join(response.streaming_content), MediaFixtures.content
+        )
+        self.assertFalse(response['ETag'].startswith('W/'))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertNotIn(
+            MediaFixtures.immutable_cache, response['Cache-Control']
+        )
+        thumbnail = self.get(MediaFixtures.thumbnail_path)
+        self.assertIn(
+            MediaFixtures.immutable_cache, thumbnail['Cache-Control']
+        )
+
+    def test_conditional_request(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        etag = self.get(MediaFixtures.upload_path)['ETag']
+        response = self.get(
+            MediaFixtures.upload_path, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_range_request(self):
+        """Запрос диапазона получает 206 и только нужные байты."""
+        response = self.get(
+            MediaFixtures.upload_path, HTTP_RANGE=MediaFixtures.range_header
+        )
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(
+            response['Content-Range'], MediaFixtures.content_range
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            MediaFixtures.content[10:20]
+        )
+        response = self.get(
+            MediaFixtures.upload_path, HTTP_RANGE=MediaFixtures.wrong_range
+        )
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    def test_offload(self):
+        """С MEDIA_OFFLOAD тело файла отдает веб-сервер."""
+        with self.settings(MEDIA_OFFLOAD=media.OFFLOAD_X_ACCEL):
+            response = self.get(MediaFixtures.upload_path)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            MediaFixtures.offload_prefix + MediaFixtures.upload_path
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_path_outside_media_root(self):
+        """Файлы вне MEDIA_ROOT недоступны."""
+        response = MediaTests.guest_client.get(MediaFixtures.traversal_url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.tests.fixtures.fixtures_metrics import MetricsFixtures
+
+TEMP_METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=MetricsFixtures.author)
+        Post.objects.create(text=MetricsFixtures.text, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(MetricsTests.author)
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        values = {}
+        for line in response.content.decode().splitlines():
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                values[name] = float(value)
+        return values
+
+    def test_view_and_fragment_metrics(self):
+        """Время ответа по view и попадания в кэш фрагментов."""
+        before = self.metrics()
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        after = self.metrics()
+        for name, growth in ((MetricsFixtures.latency, 2),
+                             (MetricsFixtures.queries, 2),
+                             (MetricsFixtures.fragment_miss, 1),
+                             (MetricsFixtures.fragment_hit, 1)):
+            with self.subTest(metric=name):
+                self.assertEqual(
+                    after[name] - before.get(name, 0), growth
+                )
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_metrics_of_other_processes(self):
+        """Значения других процессов из METRICS_DIR складываются."""
+        path = os.path.join(TEMP_METRICS_DIR, 'other.json')
+        with open(path, 'w') as file:
+            json.dump(MetricsFixtures.other_process, file)
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(response, MetricsFixtures.other_process_line)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(TEMP_METRICS_DIR, f'{os.getpid()}.json')
+            )
+        )
+
+    def test_import_without_settings_exits_cleanly(self):
+        """Импорт метрик без настроек Django не ломает выход процесса."""
+        env = {**os.environ}
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+        result = subprocess.run(
+            [sys.executable, '-c', 'import core.metrics'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stderr, '')
+
+    def test_metrics_only_for_internal_ips(self):
+        """Страница метрик скрыта от внешних адресов."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR=MetricsFixtures.foreign_ip
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -1,6 +1,13 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models.deletion import Collector
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.models import (Comment, Follow, Group, Post, User, UserCounters,
+                          deleting_posts)
 from posts.tests.fixtures.fixtures_models import ModelsFixtures
 
 
@@ -69,3 +76,82 @@ class PostModelTests(TestCase):
                     expected_value,
                     'help_text поля задан неверно'
                 )
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.author = User.objects.create_user(username='Author')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='тестовый заголовок',
+            slug='test-slug',
+            description='тестовое описание группы',
+        )
+        cls.other_group = Group.objects.create(
+            title='другой заголовок',
+            slug='other-slug',
+            description='другое описание группы',
+        )
+
+    def assertCounters(self, user, **expected):
+        counters = UserCounters.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(counters, field), value)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при создании, изменении и удалении объектов."""
+        post = Post.objects.create(
+            author=CountersTests.author,
+            text='тестовый текст',
+            group=CountersTests.group,
+        )
+        Comment.objects.create(
+            post=post, author=CountersTests.follower, text='комментарий'
+        )
+        follow = Follow.objects.create(
+            user=CountersTests.follower, author=CountersTests.author
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertCounters(
+            CountersTests.author, posts_count=1, followers_count=1
+        )
+        self.assertCounters(CountersTests.follower, following_count=1)
+        post.group = CountersTests.other_group
+        post.save()
+        CountersTests.group.refresh_from_db()
+        CountersTests.other_group.refresh_from_db()
+        self.assertEqual(CountersTests.group.posts_count, 0)
+        self.assertEqual(CountersTests.other_group.posts_count, 1)
+        follow.delete()
+        post.delete()
+        self.assertCounters(
+            CountersTests.author, posts_count=0, followers_count=0
+        )
+        self.assertCounters(CountersTests.follower, following_count=0)
+
+    def test_failed_post_delete_keeps_comment_counter(self):
+        """После неудачного удаления поста его комментарии учитываются."""
+        post = Post.objects.create(author=CountersTests.author, text='текст')
+        comment = Comment.objects.create(
+            post=post, author=CountersTests.follower, text='комментарий'
+        )
+        with mock.patch.object(Collector, 'delete', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                post.delete()
+            with self.assertRaises(DatabaseError):
+                Post.objects.filter(pk=post.pk).delete()
+        self.assertFalse(deleting_posts())
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет разошедшиеся счетчики."""
+        Post.objects.create(author=CountersTests.author, text='текст')
+        UserCounters.objects.update(posts_count=42)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(CountersTests.author, posts_count=1)
+        self.assertCounters(CountersTests.follower, posts_count=0)
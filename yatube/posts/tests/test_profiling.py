@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.template.base import Template
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.tests.fixtures.fixtures_profiling import ProfilingFixtures
+
+TEMPLATE_RENDER = Template.render
+TEMP_PROFILING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+# То же, что settings делает при PROFILING.
+@override_settings(
+    PROFILING=True,
+    PROFILING_DIR=TEMP_PROFILING_DIR,
+    TEMPLATES=[{
+        **settings.TEMPLATES[0],
+        'BACKEND': ProfilingFixtures.templates_backend,
+    }],
+    CACHES={
+        **settings.CACHES,
+        ProfilingFixtures.profiled: settings.CACHES['default'],
+        'default': {
+            'BACKEND': ProfilingFixtures.cache_backend,
+            'OPTIONS': {'CACHE': ProfilingFixtures.profiled},
+        },
+    },
+)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username=ProfilingFixtures.author)
+        Post.objects.create(text=ProfilingFixtures.text, author=author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_and_log(self):
+        """Ответ получает Server-Timing, а метрики пишутся в лог."""
+        with self.assertLogs(ProfilingFixtures.logger, 'INFO') as logs:
+            response = Client().get(reverse('posts:index'))
+        for timing in ProfilingFixtures.timings:
+            with self.subTest(timing=timing):
+                self.assertIn(timing, response['Server-Timing'])
+        self.assertNotIn('"0 queries"', response['Server-Timing'])
+        self.assertNotIn(
+            ProfilingFixtures.no_cache_lookups, response['Server-Timing']
+        )
+        self.assertNotIn(
+            ProfilingFixtures.no_template_time, response['Server-Timing']
+        )
+        for field in ProfilingFixtures.log_fields:
+            with self.subTest(field=field):
+                self.assertIn(field, logs.output[0])
+
+    @override_settings(PROFILING_SAMPLE_RATE=2)
+    def test_sampled_profile(self):
+        """Каждый N-й запрос сохраняет статистику cProfile."""
+        client = Client()
+        with self.assertLogs(ProfilingFixtures.logger, 'INFO') as logs:
+            client.get(reverse('posts:index'))
+            client.get(reverse('posts:index'))
+        self.assertNotIn('profile=', logs.output[0])
+        self.assertIn('profile=', logs.output[1])
+        self.assertEqual(len(os.listdir(TEMP_PROFILING_DIR)), 1)
+
+    @override_settings(PROFILING=False)
+    def test_disabled(self):
+        """Выключенное профилирование не добавляет заголовок."""
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_django_classes_not_patched(self):
+        """Профилирование не подменяет методы классов Django."""
+        with self.assertLogs(ProfilingFixtures.logger, 'INFO'):
+            Client().get(reverse('posts:index'))
+        self.assertIs(Template.render, TEMPLATE_RENDER)
@@ -0,0 +1,253 @@
+from importlib import import_module
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.fixtures.fixtures_query_budget import QueryBudgetFixtures
+from posts.tests.query_budget import QueryBudgetMixin
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов каждой страницы не растет вместе с данными."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username=QueryBudgetFixtures.author
+        )
+        cls.reader = User.objects.create_user(
+            username=QueryBudgetFixtures.reader,
+            password=QueryBudgetFixtures.password,
+        )
+        cls.group = Group.objects.create(
+            title=QueryBudgetFixtures.slug,
+            slug=QueryBudgetFixtures.slug,
+            description=QueryBudgetFixtures.slug,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text=QueryBudgetFixtures.text, author=cls.author, group=cls.group
+        )
+        cls.users = 0
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryBudgetTests.reader)
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTests.author)
+
+    def new_user(self):
+        QueryBudgetTests.users += 1
+        return User.objects.create_user(
+            username=f'user{QueryBudgetTests.users}'
+        )
+
+    def grow(self, count):
+        """Добавляет count авторов, постов, комментариев и подписок."""
+        for _ in range(count):
+            user = self.new_user()
+            Post.objects.create(
+                text=QueryBudgetFixtures.text, author=user,
+                group=QueryBudgetTests.group,
+            )
+            Post.objects.create(
+                text=QueryBudgetFixtures.text,
+                author=QueryBudgetTests.author,
+                group=QueryBudgetTests.group,
+            )
+            Comment.objects.create(
+                post=QueryBudgetTests.post, author=user,
+                text=QueryBudgetFixtures.text,
+            )
+            Follow.objects.create(user=QueryBudgetTests.reader, author=user)
+            Follow.objects.create(user=user, author=QueryBudgetTests.author)
+        self.size = Post.objects.filter(
+            author=QueryBudgetTests.author
+        ).count()
+
+    def post_with_comments(self):
+        post = Post.objects.create(
+            text=QueryBudgetFixtures.text, author=QueryBudgetTests.author,
+            group=QueryBudgetTests.group,
+        )
+        for _ in range(self.size):
+            Comment.objects.create(
+                post=post, author=QueryBudgetTests.reader,
+                text=QueryBudgetFixtures.text,
+            )
+        return post
+
+    def routes(self):
+        """
+        Запросы ко всем URL: имя -> функция, которая готовит данные и
+        возвращает (клиент, метод, url, данные).
+        """
+        author = QueryBudgetTests.author
+        post = QueryBudgetTests.post
+        reader = QueryBudgetTests.reader
+
+        def get(url, client=None):
+            return lambda: (client or self.client, 'get', url, None)
+
+        def comment_page():
+            comments = self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.id})
+            ).context['comments']
+            url = reverse('posts:comment_list', kwargs={'post_id': post.id})
+            url = f'{url}?after={comments.next_cursor}'
+            return self.client, 'get', url, None
+
+        def follow():
+            client = Client()
+            client.force_login(self.new_user())
+            url = reverse('posts:profile_follow',
+                          kwargs={'username': author.username})
+            return client, 'get', url, None
+
+        def unfollow():
+            user = self.new_user()
+            client = Client()
+            client.force_login(user)
+            client.get(reverse('posts:profile_follow',
+                               kwargs={'username': author.username}))
+            url = reverse('posts:profile_unfollow',
+                          kwargs={'username': author.username})
+            return client, 'get', url, None
+
+        def delete():
+            target = self.post_with_comments()
+            url = reverse('posts:post_delete', kwargs={'post_id': target.id})
+            return self.author_client, 'get', url, None
+
+        def logout():
+            client = Client()
+            client.force_login(reader)
+            return client, 'get', reverse('users:logout'), None
+
+        def reset_confirm():
+            url = reverse('users:password_reset_confirm', kwargs={
+                'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+                'token': default_token_generator.make_token(reader),
+            })
+            return Client(), 'get', url, None
+
+        return {
+            'posts:index': get(reverse('posts:index')),
+            'posts:profile': get(reverse(
+                'posts:profile', kwargs={'username': author.username}
+            )),
+            'posts:group_list': get(reverse(
+                'posts:group_list', kwargs={'slug': QueryBudgetFixtures.slug}
+            )),
+            'posts:post_search': get('{}?q={}'.format(
+                reverse('posts:post_search'),
+                QueryBudgetFixtures.search_query,
+            )),
+            'posts:post_create': get(reverse('posts:post_create')),
+            'posts:post_detail': get(reverse(
+                'posts:post_detail', kwargs={'post_id': post.id}
+            )),
+            'posts:post_edit': get(
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                self.author_client,
+            ),
+            'posts:add_comment': lambda: (
+                self.client, 'post',
+                reverse('posts:add_comment', kwargs={'post_id': post.id}),
+                {'text': QueryBudgetFixtures.text},
+            ),
+            'posts:comment_list': comment_page,
+            'posts:follow_index': get(reverse('posts:follow_index')),
+            'posts:user_export': get(
+                f'{reverse("posts:user_export")}?format=zip',
+                self.author_client,
+            ),
+            'posts:index_rss': get(reverse('posts:index_rss')),
+            'posts:index_atom': get(reverse('posts:index_atom')),
+            'posts:group_rss': get(reverse(
+                'posts:group_rss', kwargs={'slug': QueryBudgetFixtures.slug}
+            )),
+            'posts:group_atom': get(reverse(
+                'posts:group_atom', kwargs={'slug': QueryBudgetFixtures.slug}
+            )),
+            'posts:profile_rss': get(reverse(
+                'posts:profile_rss', kwargs={'username': author.username}
+            )),
+            'posts:profile_atom': get(reverse(
+                'posts:profile_atom', kwargs={'username': author.username}
+            )),
+            'posts:api_index': get(reverse('posts:api_index')),
+            'posts:api_group_list': get(reverse(
+                'posts:api_group_list',
+                kwargs={'slug': QueryBudgetFixtures.slug},
+            )),
+            'posts:api_profile': get(reverse(
+                'posts:api_profile', kwargs={'username': author.username}
+            )),
+            'posts:profile_follow': follow,
+            'posts:profile_unfollow': unfollow,
+            'posts:post_delete': delete,
+            'users:logout': logout,
+            'users:signup': get(reverse('users:signup'), Client()),
+            'users:login': get(reverse('users:login'), Client()),
+            'users:password_change': get(reverse('users:password_change')),
+            'users:password_change_done': get(
+                reverse('users:password_change_done')
+            ),
+            'users:password_reset': get(
+                reverse('users:password_reset'), Client()
+            ),
+            'users:password_reset_done': get(
+                reverse('users:password_reset_done'), Client()
+            ),
+            'users:password_reset_confirm': reset_confirm,
+            'users:password_reset_complete': get(
+                reverse('users:password_reset_complete'), Client()
+            ),
+            'about:author': get(reverse('about:author'), Client()),
+            'about:tech': get(reverse('about:tech'), Client()),
+        }
+
+    def measure(self, routes):
+        results = {}
+        for name, prepare in routes.items():
+            client, method, url, data = prepare()
+            cache.clear()
+            _, results[name] = self.record(
+                lambda: self.request(client, method, url, data)
+            )
+        return results
+
+    def request(self, client, method, url, data):
+        response = getattr(client, method)(url, data)
+        if response.streaming:
+            # Запросы потокового ответа выполняются при чтении тела.
+            b''.join(response.streaming_content)
+        return response
+
+    def test_every_url_has_budget(self):
+        """Для каждого URL приложений есть проверка числа запросов."""
+        names = set()
+        for module in QueryBudgetFixtures.url_modules:
+            urls = import_module(module)
+            names.update(
+                f'{urls.app_name}:{pattern.name}'
+                for pattern in urls.urlpatterns
+            )
+        self.assertEqual(names, set(self.routes()))
+
+    def test_query_count_does_not_grow(self):
+        """Число запросов одинаково на маленьком и большом наборе."""
+        self.grow(QueryBudgetFixtures.small)
+        small = self.measure(self.routes())
+        self.grow(QueryBudgetFixtures.large - QueryBudgetFixtures.small)
+        large = self.measure(self.routes())
+        for name in small:
+            with self.subTest(view=name):
+                self.assertConstantQueries(small[name], large[name], name)
+                self.assertNoDuplicateQueries(large[name], name)
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.fixtures.fixtures_query_plans import QueryPlansFixtures
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan, allowed=()):
+    """Строки плана с полным просмотром таблицы или сортировкой."""
+    problems = []
+    for step in plan:
+        if step in allowed:
+            continue
+        if QueryPlansFixtures.temp_b_tree in step:
+            problems.append(step)
+        elif (step.startswith(QueryPlansFixtures.full_scan_prefix)
+              and not any(marker in step for marker
+                          in QueryPlansFixtures.index_scan_markers)):
+            problems.append(step)
+    return problems
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class QueryPlansTests(TestCase):
+    """Запросы страниц для чтения не сканируют таблицы и не сортируют."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username=QueryPlansFixtures.author
+        )
+        cls.follower = User.objects.create_user(
+            username=QueryPlansFixtures.follower
+        )
+        cls.celebrity = User.objects.create_user(
+            username=QueryPlansFixtures.celebrity
+        )
+        cls.group = Group.objects.create(
+            title=QueryPlansFixtures.slug,
+            slug=QueryPlansFixtures.slug,
+            description=QueryPlansFixtures.slug,
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        Follow.objects.create(user=cls.follower, author=cls.celebrity)
+        # Второй подписчик делает Celebrity автором с чтением при показе.
+        Follow.objects.create(user=cls.author, author=cls.celebrity)
+        for i in range(QueryPlansFixtures.posts_count):
+            for author in (cls.author, cls.celebrity):
+                Post.objects.create(
+                    text=f'пост {i}', author=author, group=cls.group
+                )
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for i in range(QueryPlansFixtures.comments_count):
+            Comment.objects.create(
+                post=cls.post, author=cls.follower, text=f'комментарий {i}'
+            )
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower)
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        """URL страниц для чтения и допустимые для них шаги плана."""
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': QueryPlansFixtures.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': QueryPlansFixtures.author}),
+            reverse('posts:follow_index'),
+        ]
+        for url in feeds:
+            yield url, ()
+            yield f'{url}?page=2', ()
+            response = QueryPlansTests.follower_client.get(url)
+            after = f'{url}?after={response.context["page_obj"].next_cursor}'
+            yield after, ()
+            response = QueryPlansTests.follower_client.get(after)
+            previous_cursor = response.context['page_obj'].previous_cursor
+            yield f'{url}?before={previous_cursor}', ()
+        api_feeds = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list',
+                    kwargs={'slug': QueryPlansFixtures.slug}),
+            reverse('posts:api_profile',
+                    kwargs={'username': QueryPlansFixtures.author}),
+        ]
+        for url in api_feeds:
+            yield url, ()
+            response = QueryPlansTests.follower_client.get(url)
+            yield response.json()['next'], ()
+        yield reverse('posts:index_rss'), ()
+        yield reverse('posts:group_rss',
+                      kwargs={'slug': QueryPlansFixtures.slug}), ()
+        yield reverse('posts:profile_rss',
+                      kwargs={'username': QueryPlansFixtures.author}), ()
+        post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        yield post_url, ()
+        response = QueryPlansTests.follower_client.get(post_url)
+        yield '{}?after={}'.format(
+            reverse('posts:comment_list', kwargs={'post_id': self.post.id}),
+            response.context['comments'].next_cursor,
+        ), ()
+        yield '{}?q=пост&group={}&author={}'.format(
+            reverse('posts:post_search'),
+            QueryPlansFixtures.slug,
+            QueryPlansFixtures.author,
+        ), QueryPlansFixtures.search_allowed
+
+    def test_read_queries_use_indexes(self):
+        """Каждый запрос страниц для чтения использует индекс."""
+        for url, allowed in self.urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                QueryPlansTests.follower_client.get(url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    problems = plan_problems(explain(sql), allowed)
+                    self.assertEqual(
+                        problems, [],
+                        'Запрос просматривает таблицу целиком или '
+                        'сортирует во временном B-дереве'
+                    )
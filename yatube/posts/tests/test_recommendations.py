@@ -0,0 +1,117 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import Follow, Recommendation, User
+from posts.tests.fixtures.fixtures_recommendations import (
+    RecommendationsFixtures)
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in (
+                RecommendationsFixtures.reader,
+                RecommendationsFixtures.author,
+                RecommendationsFixtures.friend,
+                RecommendationsFixtures.neighbour,
+                RecommendationsFixtures.popular,
+            )
+        }
+        # reader -> author -> friend: друг друга.
+        # neighbour читает author, как и reader, а еще popular.
+        for user, author in (
+            (RecommendationsFixtures.reader, RecommendationsFixtures.author),
+            (RecommendationsFixtures.author, RecommendationsFixtures.friend),
+            (RecommendationsFixtures.neighbour,
+             RecommendationsFixtures.author),
+            (RecommendationsFixtures.neighbour,
+             RecommendationsFixtures.popular),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        call_command(
+            'compute_recommendations', seed=RecommendationsFixtures.seed,
+            stdout=StringIO(),
+        )
+        self.reader = RecommendationsTests.users[
+            RecommendationsFixtures.reader
+        ]
+
+    def test_scores(self):
+        """Друг друга важнее совместной подписки, свои подписки исключены."""
+        suggested = list(Recommendation.objects.filter(
+            user=self.reader
+        ).order_by('-score').values_list('author__username', flat=True))
+        self.assertEqual(suggested, [
+            RecommendationsFixtures.friend,
+            RecommendationsFixtures.popular,
+        ])
+
+    def test_followed_author_hidden(self):
+        """После подписки автор пропадает из рекомендаций до пересчета."""
+        Follow.objects.create(
+            user=self.reader,
+            author=RecommendationsTests.users[RecommendationsFixtures.friend],
+        )
+        self.assertEqual(
+            [item.author.username
+             for item in recommendations.for_user(self.reader)],
+            [RecommendationsFixtures.popular],
+        )
+
+    def test_pages_show_recommendations(self):
+        """Блок рекомендаций есть в профиле и в ленте подписок."""
+        client = Client()
+        client.force_login(self.reader)
+        for url in (
+            reverse('posts:profile', kwargs={
+                'username': RecommendationsFixtures.author,
+            }),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertContains(
+                    response, RecommendationsFixtures.block_title
+                )
+                self.assertContains(response, reverse(
+                    'posts:profile',
+                    kwargs={'username': RecommendationsFixtures.friend},
+                ))
+
+    def test_user_deleted_during_run_skipped(self):
+        """Пользователь, удаленный после загрузки графа, пропускается."""
+        load_graphs = recommendations.load_graphs
+
+        def load_then_delete():
+            graphs = load_graphs()
+            User.objects.filter(
+                username=RecommendationsFixtures.friend
+            ).delete()
+            return graphs
+
+        with mock.patch.object(
+            recommendations, 'load_graphs', load_then_delete
+        ):
+            call_command(
+                'compute_recommendations',
+                seed=RecommendationsFixtures.seed, stdout=StringIO(),
+            )
+        connection.check_constraints()
+        self.assertEqual(
+            list(Recommendation.objects.filter(
+                user=self.reader
+            ).values_list('author__username', flat=True)),
+            [RecommendationsFixtures.popular],
+        )
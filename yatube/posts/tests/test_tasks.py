@@ -0,0 +1,167 @@
+import re
+
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from posts import generations
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+from posts.tests.fixtures.fixtures_tasks import TasksFixtures
+from posts.tests.on_commit import run_on_commit
+
+executed = []
+
+
+@tasks.task(max_attempts=TasksFixtures.max_attempts)
+def flaky():
+    raise ValueError(TasksFixtures.text)
+
+
+@tasks.task(priority=TasksFixtures.high_priority)
+def important():
+    executed.append(TasksFixtures.important)
+
+
+class TasksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=TasksFixtures.author)
+        cls.follower = User.objects.create_user(
+            username=TasksFixtures.follower,
+            email=TasksFixtures.email,
+            password=TasksFixtures.password,
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        executed.clear()
+        self.client = Client()
+        self.client.force_login(TasksTests.author)
+
+    def test_post_create_enqueues_fan_out(self):
+        """Пост раскладывается по лентам не в запросе, а задачей."""
+        self.client.post(
+            reverse('posts:post_create'), {'text': TasksFixtures.text}
+        )
+        self.assertTrue(Task.objects.filter(name=TasksFixtures.fan_out))
+        self.assertFalse(TimelineEntry.objects.exists())
+
+        self.assertEqual(tasks.run_batch(), 1)
+        self.assertFalse(Task.objects.exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TasksTests.follower
+        ).exists())
+
+    def test_fan_out_refreshes_cached_follow_page(self):
+        """Лента подписок, закэшированная до раскладки, обновляется."""
+        reader = Client()
+        reader.force_login(TasksTests.follower)
+        self.client.post(
+            reverse('posts:post_create'), {'text': TasksFixtures.text}
+        )
+        self.assertNotContains(
+            reader.get(reverse('posts:follow_index')), TasksFixtures.text
+        )
+        with run_on_commit():
+            tasks.run_batch()
+        self.assertContains(
+            reader.get(reverse('posts:follow_index')), TasksFixtures.text
+        )
+
+    def test_comment_keeps_follower_scopes(self):
+        """Комментарий не меняет области лент подписок подписчиков."""
+        post = Post.objects.create(
+            author=TasksTests.author, text=TasksFixtures.text
+        )
+        scope = generations.follow_scope(TasksTests.follower.pk)
+        token = generations.get(scope)
+        with run_on_commit():
+            Comment.objects.create(
+                post=post, author=TasksTests.follower,
+                text=TasksFixtures.text,
+            )
+        self.assertEqual(generations.get(scope), token)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_former_pull_author_backfilled(self):
+        """Посты pull-автора попадают в ленты, когда он им быть перестал."""
+        reader = User.objects.create_user(username=TasksFixtures.reader)
+        follow = Follow.objects.create(user=reader, author=TasksTests.author)
+        self.client.post(
+            reverse('posts:post_create'), {'text': TasksFixtures.text}
+        )
+        tasks.run_batch()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+        follow.delete()
+        tasks.run_batch()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TasksTests.follower
+        ).exists())
+
+    def test_failed_task_retried_then_kept(self):
+        """Упавшая задача откладывается, после всех попыток -- failed."""
+        task = flaky.delay()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_batch()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn(TasksFixtures.text, task.last_error)
+
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_batch()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(tasks.run_batch(), 0)
+
+    @override_settings(TASKS_BATCH_SIZE=1)
+    def test_priority_order(self):
+        """Задачи с большим приоритетом выполняются первыми."""
+        flaky.delay()
+        important.delay()
+        tasks.run_batch()
+        self.assertEqual(executed, [TasksFixtures.important])
+
+    def test_claimed_tasks_skipped_by_other_workers(self):
+        """Занятую задачу другой рабочий процесс не берет."""
+        important.delay()
+        self.assertEqual(len(tasks.claim(TasksFixtures.owner)), 1)
+        self.assertEqual(tasks.run_batch(), 0)
+        Task.objects.update(claimed_until=timezone.now())
+        self.assertEqual(tasks.run_batch(), 1)
+        self.assertEqual(executed, [TasksFixtures.important])
+
+    def test_failed_task_keeps_finished_ones(self):
+        """Ошибка одной задачи не откатывает выполненные в той же пачке."""
+        important.delay()
+        flaky.delay()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(tasks.run_batch(), 2)
+        self.assertEqual(
+            list(Task.objects.values_list('name', 'owner')),
+            [(TasksFixtures.flaky, '')],
+        )
+
+    def test_password_reset_email_sent_by_task(self):
+        """Письмо сброса пароля отправляет фоновая задача."""
+        Client().post(
+            reverse('users:password_reset'), {'email': TasksFixtures.email}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        payload = Task.objects.get().payload
+        self.assertNotIn(TasksFixtures.email, payload)
+        self.assertNotIn(TasksFixtures.reset_path, payload)
+        tasks.run_batch()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [TasksFixtures.email])
+        link = re.search(
+            TasksFixtures.link_pattern, mail.outbox[0].body
+        ).group()
+        response = Client().get(link, follow=True)
+        self.assertTrue(response.context['validlink'])
@@ -0,0 +1,92 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import thumbnails
+from posts.models import Post, User
+from posts.templatetags.post_images import prepared_image
+from posts.tests.fixtures.fixtures_thumbnails import ThumbnailsFixtures
+from posts.tests.on_commit import run_on_commit
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username=ThumbnailsFixtures.username
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self):
+        return Post.objects.create(
+            text=ThumbnailsFixtures.text,
+            author=ThumbnailsTests.user,
+            image=SimpleUploadedFile(
+                'small.gif', ThumbnailsFixtures.small_gif
+            ),
+        )
+
+    def test_schedule_after_commit(self):
+        """После фиксации миниатюры создаются и записываются в пост."""
+        with run_on_commit():
+            post = self.create_post()
+            post.refresh_from_db()
+            self.assertEqual(post.thumbnail_names, '')
+        post.refresh_from_db()
+        names = json.loads(post.thumbnail_names)
+        self.assertEqual(set(names), set(settings.POST_THUMBNAIL_SIZES))
+        image = prepared_image(post, ThumbnailsFixtures.size)
+        self.assertTrue(image['url'].startswith(settings.MEDIA_URL))
+        self.assertEqual(
+            len(image['srcset'].split(', ')),
+            ThumbnailsFixtures.sizes_in_srcset,
+        )
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры не готовы, вместо картинки заглушка."""
+        post = self.create_post()
+        image = prepared_image(post, ThumbnailsFixtures.size)
+        self.assertEqual(image, {
+            'url': None,
+            'width': ThumbnailsFixtures.placeholder_width,
+            'height': ThumbnailsFixtures.placeholder_height,
+        })
+        post.image = ''
+        self.assertIsNone(prepared_image(post, ThumbnailsFixtures.size))
+
+    def test_pending_image_not_scheduled_twice(self):
+        """Картинка, которая уже в работе, повторно в пул не ставится."""
+        post = self.create_post()
+        executor = mock.Mock()
+        with mock.patch.object(
+            thumbnails, 'get_executor', return_value=executor
+        ):
+            thumbnails.schedule(post)
+            thumbnails.schedule(post)
+        self.assertEqual(executor.submit.call_count, 1)
+        thumbnails._pending.discard(post.image.name)
+
+    def test_generate_thumbnails_command(self):
+        """generate_thumbnails создает миниатюры для всех картинок."""
+        post = self.create_post()
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(
+            set(json.loads(post.thumbnail_names)),
+            set(settings.POST_THUMBNAIL_SIZES),
+        )
@@ -1,20 +1,30 @@
+import csv
+import io
+import json
 import shutil
 import tempfile
 import time
+import zipfile
+from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Group, Post, User
+from posts import generations
+from posts.models import Comment, Group, Post, TimelineEntry, User
 from posts.tests.fixtures.fixtures_views import ViewsFixtures
+from posts.tests.on_commit import run_on_commit
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostsViewsTests(TestCase):
     @classmethod
     def setUpTestData(cls) -> None:
@@ -53,6 +63,9 @@ class PostsViewsTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     def response_from_index_page(self):
         return PostsViewsTests.guest_client.get(
             reverse('posts:index')
@@ -74,7 +87,7 @@ class PostsViewsTests(TestCase):
         posts_from_model = list(query_model)
         response = PostsViewsTests.guest_client.get(reverse('posts:index'))
         posts_from_response = list(response.context['page_obj'].object_list)
-        response_post_counter = response.context['page_obj'].end_index()
+        response_post_counter = len(response.context['page_obj'])
         self.assertEqual(posts_from_response, posts_from_model)
         self.assertEqual(response_post_counter, ViewsFixtures.posts_on_page)
         self.assertTrue(
@@ -93,7 +106,7 @@ class PostsViewsTests(TestCase):
             reverse('posts:group_list', kwargs={'slug': ViewsFixtures.slug})
         )
         posts_from_response = response.context['page_obj'].object_list
-        response_post_counter = response.context['page_obj'].end_index()
+        response_post_counter = len(response.context['page_obj'])
         self.assertEqual(posts_from_response, posts_from_model)
         self.assertEqual(response_post_counter, ViewsFixtures.posts_on_page)
         self.assertTrue(
@@ -113,13 +126,36 @@ class PostsViewsTests(TestCase):
             reverse('posts:profile', kwargs={'username': ViewsFixtures.author})
         )
         posts_from_response = response.context['page_obj'].object_list
-        response_post_counter = response.context['page_obj'].end_index()
+        response_post_counter = len(response.context['page_obj'])
         self.assertEqual(posts_from_response, posts_from_model)
         self.assertEqual(response_post_counter, ViewsFixtures.posts_on_page)
         self.assertTrue(
             posts_from_response[ViewsFixtures.first_object_in_list].image
         )
 
+    def test_cursor_pagination(self):
+        """
+        Ссылки на следующую и предыдущую страницы строятся по курсорам,
+         старые ссылки ?page=N продолжают работать.
+        """
+        url = reverse('posts:index')
+        first_page = PostsViewsTests.guest_client.get(url).context['page_obj']
+        next_page = PostsViewsTests.guest_client.get(
+            url, {'after': first_page.next_cursor}
+        ).context['page_obj']
+        page_by_number = PostsViewsTests.guest_client.get(
+            url, {'page': ViewsFixtures.second_page}
+        ).context['page_obj']
+        previous_page = PostsViewsTests.guest_client.get(
+            url, {'before': next_page.previous_cursor}
+        ).context['page_obj']
+        expected = list(Post.objects.all()[ViewsFixtures.posts_on_page:])
+        self.assertEqual(list(next_page), expected)
+        self.assertEqual(list(page_by_number), expected)
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertFalse(next_page.has_next())
+        self.assertFalse(previous_page.has_previous())
+
     def test_post_detail_page_show_correct_context(self):
         """
         Шаблон post_detail сформирован с правильным контекстом и содержит
@@ -138,6 +174,58 @@ class PostsViewsTests(TestCase):
             post_from_response.image
         )
 
+    @override_settings(COMMENTS_PER_PAGE=ViewsFixtures.comments_per_page)
+    def test_post_detail_comments_pagination(self):
+        """
+        Комментарии выводятся страницами, следующие отдает фрагмент, а
+         число запросов не зависит от числа комментариев.
+        """
+        post = Post.objects.get(id=ViewsFixtures.first_post_id)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        Comment.objects.create(
+            post=post, author=PostsViewsTests.first_user, text='первый'
+        )
+        # Первый запрос прогревает кэш миниатюр.
+        PostsViewsTests.author_client.get(url)
+        with CaptureQueriesContext(connection) as one_comment:
+            PostsViewsTests.author_client.get(url)
+        users = (PostsViewsTests.first_user, PostsViewsTests.another_user)
+        for i in range(1, ViewsFixtures.comments_total):
+            Comment.objects.create(
+                post=post,
+                author=users[i % len(users)],
+                text=f'{ViewsFixtures.comment_text} {i}',
+            )
+        with CaptureQueriesContext(connection) as many_comments:
+            response = PostsViewsTests.author_client.get(url)
+        self.assertEqual(
+            len(many_comments), len(one_comment),
+            'Число запросов растет вместе с числом комментариев'
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), ViewsFixtures.comments_per_page)
+        self.assertTrue(comments.has_next())
+
+        shown = [comment.id for comment in comments]
+        cursor = comments.next_cursor
+        while cursor:
+            fragment = PostsViewsTests.guest_client.get(
+                reverse('posts:comment_list', kwargs={'post_id': post.id}),
+                {'after': cursor},
+            )
+            self.assertTemplateUsed(fragment, 'includes/comments.html')
+            self.assertTemplateNotUsed(fragment, 'posts/post_detail.html')
+            page = fragment.context['comments']
+            shown.extend(comment.id for comment in page)
+            cursor = page.next_cursor
+        self.assertEqual(
+            shown,
+            list(post.comments.order_by('created', 'id').values_list(
+                'id', flat=True
+            )),
+            'Комментарии потеряны или повторяются'
+        )
+
     def test_create_post_page_show_correct_context(self):
         """
         Шаблон create_post для создания поста сформирован с правильным
@@ -208,22 +296,151 @@ class PostsViewsTests(TestCase):
 
     def test_cache_index_page(self):
         """
-        На главной странице кэшируется список постов.
+        На главной странице кэшируется список постов, а изменение постов
+         сразу сбрасывает кэш.
         """
         response_with_post = self.response_from_index_page()
-        Post.objects.get(id=ViewsFixtures.last_post_id).delete()
+        Post.objects.filter(id=ViewsFixtures.last_post_id).update(
+            text=ViewsFixtures.changed_text
+        )
+        response_cached = self.response_from_index_page()
+        with run_on_commit():
+            Post.objects.get(id=ViewsFixtures.last_post_id).delete()
         response_without_post = self.response_from_index_page()
-        key = make_template_fragment_key('index_page')
-        cache.delete(key)
-        response_cleaned_cache = self.response_from_index_page()
         self.assertEqual(
             response_with_post.content,
-            response_without_post.content,
-            'Удаленный объект не сохранился в кэше')
+            response_cached.content,
+            'Список постов не сохранился в кэше')
         self.assertNotEqual(
             response_with_post.content,
-            response_cleaned_cache.content,
-            'Кэш не был очищен'
+            response_without_post.content,
+            'Кэш не был сброшен после удаления поста'
+        )
+        self.assertNotIn(
+            ViewsFixtures.changed_text,
+            response_without_post.content.decode()
+        )
+
+    def test_post_cards_cache(self):
+        """
+        Карточки постов берутся из общего кэша лент и перерисовываются
+         только после изменения поста.
+        """
+        card = 'includes/post_card.html'
+        url = reverse('posts:index')
+        response = PostsViewsTests.author_client.get(url)
+        self.assertEqual(
+            [t.name for t in response.templates].count(card),
+            ViewsFixtures.posts_on_page
+        )
+        with run_on_commit():
+            generations.bump('index')
+        response = PostsViewsTests.author_client.get(url)
+        self.assertNotIn(card, [t.name for t in response.templates])
+
+        post = Post.objects.get(id=ViewsFixtures.last_post_id)
+        post.text = ViewsFixtures.changed_text
+        with run_on_commit():
+            post.save()
+        response = PostsViewsTests.author_client.get(url)
+        self.assertEqual([t.name for t in response.templates].count(card), 1)
+        self.assertContains(response, ViewsFixtures.changed_text)
+        response = PostsViewsTests.author_client.get(reverse(
+            'posts:profile', kwargs={'username': ViewsFixtures.author}
+        ))
+        self.assertNotIn(card, [t.name for t in response.templates])
+
+        other = User.objects.get(pk=PostsViewsTests.another_user.pk)
+        other.first_name = ViewsFixtures.changed_text
+        with run_on_commit():
+            other.save()
+        response = PostsViewsTests.author_client.get(url)
+        self.assertNotIn(card, [t.name for t in response.templates])
+        author = User.objects.get(pk=PostsViewsTests.author.pk)
+        author.first_name = ViewsFixtures.changed_text
+        with run_on_commit():
+            author.save()
+        response = PostsViewsTests.author_client.get(url)
+        self.assertEqual(
+            [t.name for t in response.templates].count(card),
+            ViewsFixtures.posts_on_page
+        )
+
+    def test_generation_bumped_after_commit(self):
+        """
+        Токен поколения меняется только после фиксации транзакции, иначе
+         параллельный запрос закэшировал бы старые данные под новым токеном.
+        """
+        token = generations.get('index')
+        with run_on_commit():
+            Post.objects.get(id=ViewsFixtures.last_post_id).delete()
+            self.assertEqual(generations.get('index'), token)
+        self.assertNotEqual(generations.get('index'), token)
+
+    def test_conditional_get_for_anonymous(self):
+        """
+        Анонимный читатель получает ETag и ответ 304, если страница не
+         изменилась. Авторизованным пользователям страница не кэшируется.
+        """
+        url = reverse('posts:index')
+        response = PostsViewsTests.guest_client.get(url)
+        response_not_modified = PostsViewsTests.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(
+            response_not_modified.status_code, HTTPStatus.NOT_MODIFIED
+        )
+        self.assertEqual(response_not_modified['ETag'], response['ETag'])
+        with run_on_commit():
+            Post.objects.get(id=ViewsFixtures.last_post_id).delete()
+        response_modified = PostsViewsTests.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response_modified.status_code, HTTPStatus.OK)
+        response_authorized = PostsViewsTests.author_client.get(url)
+        self.assertFalse(response_authorized.has_header('ETag'))
+        self.assertIn('private', response_authorized['Cache-Control'])
+
+    def test_post_search(self):
+        """
+        Поиск находит посты по словам из текста, учитывает фильтры и
+         видит изменения постов.
+        """
+        url = reverse('posts:post_search')
+        response = PostsViewsTests.guest_client.get(
+            url, {'q': str(ViewsFixtures.last_post_id)}
+        )
+        response_other_group = PostsViewsTests.guest_client.get(
+            url, {'q': ViewsFixtures.text, 'author': ViewsFixtures.first_user}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [Post.objects.get(id=ViewsFixtures.last_post_id)]
+        )
+        self.assertFalse(response_other_group.context['page_obj'])
+        first_page = PostsViewsTests.guest_client.get(
+            url, {'q': ViewsFixtures.text}
+        ).context['page_obj']
+        next_page = PostsViewsTests.guest_client.get(
+            url, {'q': ViewsFixtures.text, 'after': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            len(first_page) + len(next_page), ViewsFixtures.last_post_id
+        )
+        self.assertFalse(set(first_page) & set(next_page))
+        PostsViewsTests.author_client.post(
+            reverse(
+                'posts:post_edit',
+                kwargs={'post_id': ViewsFixtures.first_post_id}
+            ),
+            {'text': ViewsFixtures.changed_text},
+        )
+        response_changed = PostsViewsTests.guest_client.get(
+            url, {'q': ViewsFixtures.changed_text}
+        )
+        self.assertEqual(
+            [post.id for post in response_changed.context['page_obj']],
+            [ViewsFixtures.first_post_id]
         )
 
     def test_profile_follow(self):
@@ -284,17 +501,16 @@ class PostsViewsTests(TestCase):
                 kwargs={'username': PostsViewsTests.author.username}
             )
         )
+        call_command('run_tasks', once=True, workers=1)
         response_first_user = PostsViewsTests.first_user_client.get(
             reverse('posts:follow_index')
         )
-        count_from_first_user = (
-            response_first_user.context['page_obj'].paginator.count
-        )
+        count_from_first_user = len(response_first_user.context['page_obj'])
         response_another_user = PostsViewsTests.another_user_client.get(
             reverse('posts:follow_index')
         )
-        count_from_another_user = (
-            response_another_user.context['page_obj'].paginator.count
+        count_from_another_user = len(
+            response_another_user.context['page_obj']
         )
         self.assertTrue(
             count_from_first_user,
@@ -304,3 +520,212 @@ class PostsViewsTests(TestCase):
             count_from_another_user,
             'У неподписанного пользователя обнаружены посты в избранном'
         )
+
+    def test_new_post_in_follow_page(self):
+        """
+        Новый пост автора попадает в ленту подписчика фоновой задачей,
+         а после отписки лента очищается.
+        """
+        follow_url = reverse(
+            'posts:profile_follow',
+            kwargs={'username': PostsViewsTests.author.username}
+        )
+        unfollow_url = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': PostsViewsTests.author.username}
+        )
+        PostsViewsTests.first_user_client.get(follow_url)
+        PostsViewsTests.author_client.post(
+            reverse('posts:post_create'), {'text': ViewsFixtures.text}
+        )
+        call_command('run_tasks', once=True, workers=1)
+        new_post = Post.objects.first()
+        response = PostsViewsTests.first_user_client.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(
+            response.context['page_obj'][ViewsFixtures.first_object_in_list],
+            new_post,
+            'Новый пост не попал в ленту подписчика'
+        )
+        PostsViewsTests.first_user_client.get(unfollow_url)
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=PostsViewsTests.first_user
+            ).exists(),
+            'Лента подписчика не очищена после отписки'
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_page_for_pull_author(self):
+        """
+        Посты популярных авторов не раскладываются по лентам, но
+         подмешиваются в ленту подписчика при чтении.
+        """
+        PostsViewsTests.first_user_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': PostsViewsTests.author.username}
+            )
+        )
+        call_command('run_tasks', once=True, workers=1)
+        response = PostsViewsTests.first_user_client.get(
+            reverse('posts:follow_index')
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=PostsViewsTests.first_user
+            ).exists()
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.all()[:ViewsFixtures.posts_on_page])
+        )
+
+    def test_user_export(self):
+        """Пользователь выгружает свои посты и комментарии потоком."""
+        Comment.objects.create(
+            post=Post.objects.get(id=ViewsFixtures.first_post_id),
+            author=PostsViewsTests.author,
+            text=ViewsFixtures.comment_text,
+        )
+        url = reverse('posts:user_export')
+        response = PostsViewsTests.author_client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        self.assertEqual(
+            [row['type'] for row in rows].count('post'),
+            ViewsFixtures.last_post_id
+        )
+        self.assertEqual(rows[-1]['text'], ViewsFixtures.comment_text)
+
+        response = PostsViewsTests.author_client.get(
+            url, {'format': 'ndjson'}
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), ViewsFixtures.last_post_id + 1)
+        self.assertEqual(json.loads(lines[0])['type'], 'post')
+
+        response = PostsViewsTests.author_client.get(url, {'format': 'zip'})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        names = archive.namelist()
+        self.assertIn('data.ndjson', names)
+        self.assertTrue(
+            any(name.startswith('images/') for name in names),
+            'Картинки не попали в архив'
+        )
+        self.assertIsNone(archive.testzip())
+
+        response = PostsViewsTests.first_user_client.get(
+            url, {'format': 'ndjson'}
+        )
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_api_feeds(self):
+        """JSON API отдает ленты с выбранными полями и курсорами."""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list',
+                    kwargs={'slug': ViewsFixtures.slug}),
+            reverse('posts:api_profile',
+                    kwargs={'username': ViewsFixtures.author}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = PostsViewsTests.guest_client.get(
+                    url, {'fields': ViewsFixtures.api_fields}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                data = response.json()
+                first = data['results'][0]
+                self.assertEqual(
+                    list(first), ViewsFixtures.api_fields.split(',')
+                )
+                self.assertEqual(first['id'], ViewsFixtures.last_post_id)
+                self.assertEqual(first['author'], ViewsFixtures.author)
+                self.assertTrue(first['image'].startswith(settings.MEDIA_URL))
+                self.assertIsNone(data['previous'])
+
+                response = PostsViewsTests.guest_client.get(data['next'])
+                data = response.json()
+                self.assertEqual(
+                    len(data['results']),
+                    ViewsFixtures.last_post_id - ViewsFixtures.posts_on_page
+                )
+                self.assertIn('fields=', data['previous'])
+                self.assertIsNone(data['next'])
+
+        url = urls[0]
+        etag = PostsViewsTests.guest_client.get(url)['ETag']
+        response = PostsViewsTests.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = PostsViewsTests.guest_client.get(
+            url, {'fields': ViewsFixtures.api_wrong_fields}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = PostsViewsTests.guest_client.get(reverse(
+            'posts:api_group_list', kwargs={'slug': ViewsFixtures.author}
+        ))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_syndication_feeds(self):
+        """RSS и Atom отдаются из кэша и получают 304 без изменений."""
+        feeds = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss',
+                    kwargs={'slug': ViewsFixtures.slug}): 'rss',
+            reverse('posts:group_atom',
+                    kwargs={'slug': ViewsFixtures.slug}): 'atom',
+            reverse('posts:profile_rss',
+                    kwargs={'username': ViewsFixtures.author}): 'rss',
+            reverse('posts:profile_atom',
+                    kwargs={'username': ViewsFixtures.author}): 'atom',
+        }
+        for url, content_type in feeds.items():
+            with self.subTest(url=url):
+                response = PostsViewsTests.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn(content_type, response['Content-Type'])
+                self.assertContains(
+                    response, f'{ViewsFixtures.last_post_id} '
+                )
+                response = PostsViewsTests.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+        url = reverse('posts:group_rss', kwargs={'slug': ViewsFixtures.slug})
+        response = PostsViewsTests.guest_client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        post = Post.objects.get(id=ViewsFixtures.last_post_id)
+        post.text = ViewsFixtures.changed_text
+        # Правка на секунду позже: HTTP-дата хранит целые секунды.
+        later = time.time() + 1
+        with mock.patch('posts.generations.time.time', return_value=later):
+            with run_on_commit():
+                post.save()
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', etag),
+            ('HTTP_IF_MODIFIED_SINCE', last_modified),
+        ):
+            with self.subTest(header=header):
+                response = PostsViewsTests.guest_client.get(
+                    url, **{header: value}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, ViewsFixtures.changed_text)
+        with CaptureQueriesContext(connection) as queries:
+            response = PostsViewsTests.guest_client.get(url)
+        self.assertContains(response, ViewsFixtures.changed_text)
+        self.assertEqual(
+            len(queries), 0, 'Лента должна отдаваться из кэша'
+        )
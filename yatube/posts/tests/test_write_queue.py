@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase, override_settings
+
+from core import write_queue
+from posts.models import Group
+from posts.tests.fixtures.fixtures_write_queue import WriteQueueFixtures
+
+
+def create_group(index, slug=None):
+    return Group.objects.create(
+        title=WriteQueueFixtures.title.format(index),
+        slug=slug or WriteQueueFixtures.slug.format(index),
+    ).pk
+
+
+@override_settings(SQLITE_WRITE_QUEUE=True)
+class WriteQueueTests(TransactionTestCase):
+    """Записи из разных потоков проходят через один поток-писатель."""
+
+    def test_concurrent_writes_committed(self):
+        """Каждый поток получает результат своей функции."""
+        results = {}
+
+        def worker(index):
+            try:
+                results[index] = write_queue.execute(create_group, index)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(WriteQueueFixtures.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), WriteQueueFixtures.threads)
+        self.assertEqual(
+            set(Group.objects.values_list('pk', flat=True)),
+            set(results.values()),
+        )
+
+    def test_error_does_not_roll_back_batch(self):
+        """Исключение функции достается ее future, пачка фиксируется."""
+        batch = [
+            (Future(), create_group, (0,), {}),
+            (Future(), create_group, (1,), {
+                'slug': WriteQueueFixtures.duplicate_slug,
+            }),
+            (Future(), create_group, (2,), {}),
+        ]
+        write_queue._run(batch)
+        first, failed, last = (future for future, *_ in batch)
+        self.assertIsInstance(failed.exception(), IntegrityError)
+        self.assertEqual(
+            set(Group.objects.values_list('pk', flat=True)),
+            {first.result(), last.result()},
+        )
+
+    @override_settings(SQLITE_WRITE_TIMEOUT=WriteQueueFixtures.timeout)
+    def test_stalled_writer_falls_back_to_inline(self):
+        """Если писатель не берет функцию, она выполняется сразу."""
+        # Очередь, которую никто не читает.
+        stalled = queue.Queue()
+        with mock.patch.object(write_queue, '_queue', stalled):
+            with self.assertLogs('core.write_queue', 'WARNING'):
+                pk = write_queue.execute(create_group, 0)
+        self.assertTrue(Group.objects.filter(pk=pk).exists())
+        future, *_ = stalled.get_nowait()
+        self.assertTrue(future.cancelled())
+
+    @override_settings(SQLITE_WRITE_TIMEOUT=WriteQueueFixtures.timeout)
+    def test_running_write_is_awaited(self):
+        """Функцию, которую писатель уже начал, ждут дольше срока."""
+        def slow_create_group(index):
+            time.sleep(WriteQueueFixtures.timeout * 20)
+            return create_group(index)
+
+        pk = write_queue.execute(slow_create_group, 0)
+        self.assertEqual(list(Group.objects.values_list('pk', flat=True)),
+                         [pk])
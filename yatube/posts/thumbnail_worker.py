@@ -0,0 +1,52 @@
+"""
+Код, который выполняется в процессах пула миниатюр.
+
+Модуль не импортирует модели на верхнем уровне: процессы запускаются
+методом spawn, и Django в них настраивается только в init_worker.
+"""
+import functools
+
+import django
+from django.conf import settings
+from PIL import features
+
+
+@functools.lru_cache(maxsize=None)
+def _supports(image_format):
+    return features.check(image_format.lower())
+
+
+def thumbnail_format():
+    image_format = settings.POST_THUMBNAIL_FORMAT
+    if image_format == 'WEBP' and not _supports(image_format):
+        return 'JPEG'
+    return image_format
+
+
+def get_sizes():
+    """Размеры миниатюр с опциями sorl-thumbnail, включая формат."""
+    image_format = thumbnail_format()
+    return {
+        name: (geometry, dict(options, format=image_format))
+        for name, (geometry, options)
+        in settings.POST_THUMBNAIL_SIZES.items()
+    }
+
+
+def init_worker():
+    django.setup()
+
+
+def generate(image_name):
+    """
+    Создает миниатюры всех размеров для одной картинки.
+
+    Возвращает (image_name, {размер: имя файла миниатюры}).
+    """
+    from sorl.thumbnail import get_thumbnail
+
+    names = {
+        size: get_thumbnail(image_name, geometry, **options).name
+        for size, (geometry, options) in get_sizes().items()
+    }
+    return image_name, names
@@ -0,0 +1,168 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+Все размеры, которые используют шаблоны, перечислены в
+settings.POST_THUMBNAIL_SIZES, варианты для srcset -- в
+settings.POST_THUMBNAIL_SRCSETS. После сохранения поста миниатюры создаются
+в пуле процессов, а имена готовых файлов записываются в
+Post.thumbnail_names. Шаблоны показывают только уже готовые миниатюры
+(тег prepared_image) и заглушку вместо остальных, поэтому запрос никогда
+не создает миниатюру сам.
+
+При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу в вызывающем потоке.
+"""
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from sorl.thumbnail import default
+
+from core.metrics import THUMBNAIL_SECONDS
+
+from . import generations
+from .models import Post
+from .thumbnail_worker import generate, get_sizes, init_worker
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+# Отдельный поток с собственным соединением с базой записывает имена
+# миниатюр и сбрасывает кэш страниц после того, как миниатюры готовы.
+_notifier = ThreadPoolExecutor(max_workers=1)
+_pending = set()
+_lock = threading.Lock()
+
+
+class InlineExecutor(Executor):
+    """Выполняет функцию сразу при submit, в вызывающем потоке."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+def get_size(name):
+    return get_sizes()[name]
+
+
+def get_dimensions(size):
+    """Ширина и высота миниатюры по ее геометрии."""
+    geometry, _ = get_size(size)
+    width, height = geometry.split('x')
+    return int(width), int(height)
+
+
+def prepared_names(post):
+    """Готовые миниатюры поста: {размер: имя файла}."""
+    if not post.thumbnail_names:
+        return {}
+    return json.loads(post.thumbnail_names)
+
+
+def get_prepared_url(post, size):
+    name = prepared_names(post).get(size)
+    return default.storage.url(name) if name else None
+
+
+def get_prepared_srcset(post, name):
+    """
+    Значение srcset из готовых вариантов картинки.
+
+    Варианты перечислены в settings.POST_THUMBNAIL_SRCSETS[name]; те,
+    что еще создаются, пропускаются.
+    """
+    names = prepared_names(post)
+    candidates = []
+    for size in settings.POST_THUMBNAIL_SRCSETS.get(name, (name,)):
+        if size in names:
+            width, _ = get_dimensions(size)
+            candidates.append(f'{default.storage.url(names[size])} {width}w')
+    return ', '.join(candidates)
+
+
+def create_executor(max_workers=None):
+    if max_workers is None:
+        max_workers = settings.THUMBNAIL_WORKERS
+    if not max_workers:
+        return InlineExecutor()
+    # spawn вместо fork: дочерние процессы не должны наследовать
+    # открытые соединения с базой.
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+    )
+
+
+def get_executor():
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        return InlineExecutor()
+    with _lock:
+        if _executor is None:
+            _executor = create_executor()
+        return _executor
+
+
+def save_names(image_name, names):
+    """Записывает готовые миниатюры в посты с этой картинкой."""
+    posts = list(Post.objects.select_related('author').filter(
+        image=image_name
+    ))
+    # Карточка поста меняет заглушку на картинку.
+    Post.objects.filter(image=image_name).update(
+        thumbnail_names=json.dumps(names), updated_at=timezone.now()
+    )
+    for post in posts:
+        generations.bump_post(post)
+
+
+def _save_names(image_name, names):
+    try:
+        save_names(image_name, names)
+    finally:
+        connection.close()
+
+
+def _done(image_name, started, future):
+    with _lock:
+        _pending.discard(image_name)
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось создать миниатюры для %s', image_name,
+            exc_info=future.exception(),
+        )
+        return
+    THUMBNAIL_SECONDS.observe(time.monotonic() - started)
+    _, names = future.result()
+    if not settings.THUMBNAIL_WORKERS:
+        save_names(image_name, names)
+    else:
+        _notifier.submit(_save_names, image_name, names)
+
+
+def schedule(post):
+    """Ставит картинку поста в очередь пула, если она еще не в работе."""
+    image_name = post.image.name
+    if not image_name:
+        return
+    with _lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    started = time.monotonic()
+    future = get_executor().submit(generate, image_name)
+    future.add_done_callback(
+        lambda future: _done(image_name, started, future)
+    )
@@ -0,0 +1,168 @@
+"""
+Материализованные ленты подписок.
+
+При публикации пост раскладывается в ленты подписчиков автора
+(fan-out on write), поэтому страница follow_index читается одним
+диапазонным сканом по индексу (user, -pub_date, -post). Авторы, у которых
+подписчиков больше TIMELINE_FANOUT_LIMIT, в ленты не раскладываются:
+их посты подмешиваются при чтении. Когда у такого автора снова становится
+не больше TIMELINE_FANOUT_LIMIT подписчиков, его посты заново
+раскладываются по лентам (backfill_author).
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import cached_property
+
+from core.paginator import CursorPaginator
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+
+def is_pull_author(author_id):
+    """Посты автора не раскладываются по лентам, а читаются на лету."""
+    return UserCounters.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def pull_authors(user):
+    """Авторы из подписок user, которые обслуживаются при чтении."""
+    return Follow.objects.filter(
+        user=user,
+        author__counters__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True)
+
+
+def _bulk_create(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_create(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(follow):
+    """Заполняет ленту подписчика постами автора после подписки."""
+    if is_pull_author(follow.author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('id', 'pub_date')
+    _bulk_create(
+        TimelineEntry(
+            user_id=follow.user_id,
+            post_id=post_id,
+            author_id=follow.author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def backfill_author(author_id):
+    """
+    Раскладывает все посты автора по лентам его подписчиков.
+
+    Посты, опубликованные, пока автор читался на лету, в ленты не
+    попадали; уже разложенные пропускаются.
+    """
+    follows = Follow.objects.filter(author_id=author_id).order_by('pk')
+    for follow in follows.iterator():
+        backfill(follow)
+
+
+def rebuild():
+    """
+    Перестраивает все ленты одним запросом INSERT ... SELECT.
+
+    Нужна после массовой загрузки данных в обход сигналов; счетчики
+    подписчиков к этому моменту должны быть пересчитаны.
+    """
+    entries = TimelineEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {entries}')
+        cursor.execute(
+            f'INSERT INTO {entries} (user_id, post_id, author_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            f'FROM {Follow._meta.db_table} AS follow '
+            f'JOIN {Post._meta.db_table} AS post '
+            f'ON post.author_id = follow.author_id '
+            f'JOIN {UserCounters._meta.db_table} AS counters '
+            f'ON counters.user_id = follow.author_id '
+            f'WHERE counters.followers_count <= %s',
+            [settings.TIMELINE_FANOUT_LIMIT],
+        )
+        return cursor.rowcount
+
+
+def prune(follow):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Курсорная пагинация ленты подписок.
+
+    Страница читается из TimelineEntry и при необходимости дополняется
+    постами pull-авторов. Курсоры совпадают с курсорами обычных лент,
+    так как ключ записи ленты — это (pub_date, id) ее поста.
+    """
+
+    def __init__(self, object_list, per_page, user):
+        super().__init__(object_list, per_page, ('-pub_date', '-post_id'))
+        self.user = user
+
+    @cached_property
+    def pull_authors(self):
+        return list(pull_authors(self.user))
+
+    def key(self, obj):
+        return obj.pub_date, obj.id
+
+    def fetch(self, cursor, backwards, limit):
+        entries = self.keyset(
+            self.object_list.select_related('post__author', 'post__group'),
+            self.fields, cursor, backwards,
+        )[:limit]
+        posts = [entry.post for entry in entries]
+        if not self.pull_authors:
+            return posts
+        pulled = self.keyset(
+            Post.objects.select_related('author', 'group').filter(
+                author_id__in=self.pull_authors
+            ),
+            ('pub_date', 'id'), cursor, backwards,
+        )[:limit]
+        # Посты автора могли попасть в ленты до того, как он стал
+        # pull-автором, поэтому дубликаты отбрасываются.
+        seen = {post.id for post in posts}
+        posts.extend(post for post in pulled if post.id not in seen)
+        posts.sort(key=self.key, reverse=self.descending != backwards)
+        return posts[:limit]
+
+    def fetch_offset(self, offset, limit):
+        return self.fetch(None, False, offset + limit)[offset:]
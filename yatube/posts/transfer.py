@@ -0,0 +1,52 @@
+"""
+Формат переноса данных между окружениями (export_data / import_data).
+
+Каталог выгрузки содержит файл data.jsonl (или data.jsonl.gz) с одной
+записью JSON на строку и каталог media с картинками постов. Записи идут
+в порядке зависимостей: пользователи, группы, посты, комментарии,
+подписки. Связи записываются естественными ключами (username, slug),
+поэтому при загрузке первичные ключи назначаются заново. У постов
+естественного ключа нет: запись поста хранит его id в исходной базе, а
+комментарий ссылается на этот id.
+"""
+import gzip
+import json
+import os
+
+DATA_FILE = 'data.jsonl'
+MEDIA_DIR = 'media'
+
+USER = 'user'
+GROUP = 'group'
+POST = 'post'
+COMMENT = 'comment'
+FOLLOW = 'follow'
+MODELS = (USER, GROUP, POST, COMMENT, FOLLOW)
+
+
+def data_path(directory, compress=False):
+    return os.path.join(directory, DATA_FILE + ('.gz' if compress else ''))
+
+
+def find_data(directory):
+    for compress in (False, True):
+        path = data_path(directory, compress)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(data_path(directory))
+
+
+def open_data(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def dumps(record):
+    return json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+
+def read_records(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
@@ -1,76 +1,155 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from core import write_queue
+from core.db_router import use_replica
+from core.paginator import paginate
 
+from . import (export, generations, recommendations, search, tasks,
+               timeline)
+from .decorators import anonymous_page_cache
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Comment, Follow, Group, Post, User
 
+
+@use_replica
+@anonymous_page_cache(lambda: ['index'])
 def index(request):
     posts_list = Post.objects.select_related(
         'group', 'author'
     ).all()
-    paginator = Paginator(posts_list, settings.OBJECTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts_list)
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
         'index': True,
+        'feed_cache': generations.feed_cache('index'),
     }
     return render(request, template, context)
 
 
+@use_replica
+@anonymous_page_cache(lambda slug: [generations.group_scope(slug)])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    paginator = Paginator(posts_list, settings.OBJECTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = group.posts.select_related('author').all()
+    page_obj = paginate(request, posts_list)
     template = 'posts/group_list.html'
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_cache': generations.feed_cache(
+            generations.group_scope(group.slug)
+        ),
     }
     return render(request, template, context)
 
 
+@use_replica
+@anonymous_page_cache(lambda username: [generations.author_scope(username)])
 def profile(request, username):
-    profile = get_object_or_404(User, username=username)
+    profile = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
     posts_list = profile.posts.select_related('group').all()
-    paginator = Paginator(posts_list, settings.OBJECTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts_list)
     template = 'posts/profile.html'
     context = {
         'page_obj': page_obj,
         'profile': profile,
+        'feed_cache': generations.feed_cache(
+            generations.author_scope(profile.username)
+        ),
         'following': (
             request.user.is_authenticated and profile.following.filter(
                 user=request.user
             ).exists()
-        )
+        ),
+        'recommendations': recommendations.for_user(request.user),
     }
     return render(request, template, context)
 
 
+def post_detail_scopes(post_id):
+    author = Post.objects.filter(
+        id=post_id
+    ).values_list('author__username', flat=True).first()
+    scopes = [generations.post_scope(post_id)]
+    if author is not None:
+        scopes.append(generations.author_scope(author))
+    return scopes
+
+
+@use_replica
+@anonymous_page_cache(post_detail_scopes)
 def post_detail(request, post_id):
     query = Post.objects.select_related(
-        'group', 'author'
+        'group', 'author', 'author__counters'
     )
     post = get_object_or_404(query, id=post_id)
-    comments = post.comments.all()
     form = CommentForm()
     template = 'posts/post_detail.html'
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': paginate_comments(request, post.id),
+    }
+    return render(request, template, context)
+
+
+def paginate_comments(request, post_id):
+    comments = Comment.objects.filter(
+        post_id=post_id
+    ).select_related('author')
+    return paginate(
+        request,
+        comments,
+        per_page=settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'id'),
+    )
+
+
+@anonymous_page_cache(post_detail_scopes)
+def comment_list(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать еще»."""
+    get_object_or_404(Post, id=post_id)
+    template = 'includes/comments.html'
+    context = {
+        'post_id': post_id,
+        'comments': paginate_comments(request, post_id),
+    }
+    return render(request, template, context)
+
+
+def post_search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        page_obj = paginate(
+            request,
+            Post.objects.select_related('author', 'group'),
+            paginator_class=search.SearchPaginator,
+            query=form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+        )
+    template = 'posts/search.html'
+    context = {
+        'form': form,
+        'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+def create_post(post, author):
+    post.author = author
+    post.save()
+    tasks.fan_out_post.delay(post.pk)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -80,8 +159,11 @@ def post_create(request):
 
     if form.is_valid():
         post = form.save(commit=False)
-        post.author = request.user
-        post.save()
+        # Картинка сохраняется до постановки в очередь, чтобы поток записи
+        # не ждал хранилище.
+        if post.image:
+            post.image.save(post.image.name, post.image.file, save=False)
+        write_queue.execute(create_post, post, request.user)
         return redirect('posts:profile', request.user.username)
 
     template = 'posts/create_post.html'
@@ -118,59 +200,103 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+def create_comment(form, author, post):
+    comment = form.save(commit=False)
+    comment.author = author
+    comment.post = post
+    comment.save()
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        write_queue.execute(create_comment, form, request.user, post)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@use_replica
 @login_required
 def follow_index(request):
     user = request.user
-    posts_list = Post.objects.select_related(
-        'author', 'group'
-    ).filter(
-        author__following__user=user
+    page_obj = paginate(
+        request,
+        user.timeline.all(),
+        paginator_class=timeline.TimelinePaginator,
+        user=user,
     )
-    paginator = Paginator(posts_list, settings.OBJECTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Новые посты меняют область автора, а не области всех его
+    # подписчиков.
+    authors = User.objects.filter(
+        following__user=user
+    ).order_by('following__author').values_list('username', flat=True)
     template = 'posts/follow.html'
     context = {
         'page_obj': page_obj,
-        'follow': True
+        'follow': True,
+        'feed_cache': generations.feed_cache(
+            generations.follow_scope(user.id),
+            *(generations.author_scope(name) for name in authors)
+        ),
+        'recommendations': recommendations.for_user(user),
     }
     return render(request, template, context)
 
 
+@login_required
+def user_export(request):
+    """Потоковая выгрузка постов и комментариев пользователя."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in export.FORMATS:
+        raise Http404('Неизвестный формат выгрузки')
+    content_type, extension = export.FORMATS[export_format]
+    response = StreamingHttpResponse(
+        export.STREAMS[export_format](request.user),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{request.user.username}.{extension}"'
+    )
+    return response
+
+
+def follow_author(user, author):
+    follow, created = Follow.objects.get_or_create(user=user, author=author)
+    if created:
+        tasks.backfill_timeline.delay(follow.pk)
+
+
+def unfollow_author(follow):
+    timeline.prune(follow)
+    follow.delete()
+
+
 @login_required
 def profile_follow(request, username):
     profile = get_object_or_404(User, username=username)
     if request.user != profile:
-        Follow.objects.get_or_create(user=request.user, author=profile)
+        write_queue.execute(follow_author, request.user, profile)
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
+    follow = get_object_or_404(
         Follow,
         user=request.user,
         author__username=username
-    ).delete()
+    )
+    write_queue.execute(unfollow_author, follow)
     return redirect('posts:profile', username)
 
 
 @login_required
+@transaction.atomic
 def post_delete(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.select_related('author'), id=post_id)
     if request.user == post.author:
+        # Записи лент подписчиков удаляются каскадно вместе с постом.
         post.delete()
         return redirect('posts:profile', request.user.username)
     else:
@@ -1,6 +1,8 @@
-from django.contrib.auth import get_user_model
+from django.contrib.auth import forms, get_user_model
 from django.contrib.auth.forms import UserCreationForm
 
+from . import tasks
+
 User = get_user_model()
 
 
@@ -9,3 +11,16 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class PasswordResetForm(forms.PasswordResetForm):
+    """Письмо со ссылкой собирает и отправляет фоновая задача."""
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        tasks.send_password_reset.delay(
+            context['user'].pk, context['domain'], context['site_name'],
+            context['protocol'], subject_template_name, email_template_name,
+            from_email, html_email_template_name,
+        )
@@ -0,0 +1,46 @@
+"""Фоновые задачи пользователей (core.tasks)."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.tasks import task
+
+User = get_user_model()
+
+
+@task(priority=10)
+def send_password_reset(user_id, domain, site_name, protocol,
+                        subject_template_name, email_template_name,
+                        from_email, html_email_template_name=None):
+    """
+    Собирает и отправляет письмо сброса пароля.
+
+    Ссылка со сроком действия создается здесь, а не в запросе, поэтому в
+    очереди (и в упавших задачах) хранится только id пользователя.
+    """
+    user = User._default_manager.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+    email = getattr(user, User.get_email_field_name())
+    context = {
+        'email': email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': protocol,
+    }
+    subject = loader.render_to_string(subject_template_name, context)
+    subject = ''.join(subject.splitlines())
+    body = loader.render_to_string(email_template_name, context)
+    message = EmailMultiAlternatives(subject, body, from_email, [email])
+    if html_email_template_name is not None:
+        message.attach_alternative(
+            loader.render_to_string(html_email_template_name, context),
+            'text/html',
+        )
+    message.send()
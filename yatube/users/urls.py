@@ -8,6 +8,7 @@ from django.contrib.auth.views import (LoginView, LogoutView,
 from django.urls import path, reverse_lazy
 
 from . import views
+from .forms import PasswordResetForm
 
 app_name = 'users'
 
@@ -48,6 +49,7 @@ urlpatterns = [
         'password_reset/',
         PasswordResetView.as_view(
             template_name='users/password_reset_form.html',
+            form_class=PasswordResetForm,
             success_url=reverse_lazy('users:password_reset_done'),
         ),
         name='password_reset'
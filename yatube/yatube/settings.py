@@ -51,10 +51,11 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,9 +63,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.db_router.ReplicaPinMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -97,11 +102,45 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение и его PRAGMA переиспользуются между запросами.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# PRAGMA для каждого нового соединения с SQLite (core.backends.sqlite3).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_IMMEDIATE_TRANSACTIONS = True
+
+# Короткие записи из view выполняются одним потоком пачками в одной
+# транзакции (core.write_queue).
+SQLITE_WRITE_QUEUE = config('SQLITE_WRITE_QUEUE', default=True, cast=bool)
+SQLITE_WRITE_BATCH_SIZE = 50
+# Сколько секунд ждать, пока поток записи возьмет функцию из очереди.
+SQLITE_WRITE_TIMEOUT = 5
+
+# Реплики для чтения лент (core.db_router). DATABASE_REPLICAS=N добавляет
+# базы replica1..replicaN рядом с основной; локально их заполняет
+# manage.py replicate (с --interval -- постоянно). После изменяющего
+# запроса пользователь REPLICA_PIN_SECONDS секунд читает основную базу.
+DATABASE_REPLICAS = []
+for number in range(1, config('DATABASE_REPLICAS', default=0, cast=int) + 1):
+    DATABASE_REPLICAS.append(f'replica{number}')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,6 +185,16 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Отдача медиафайлов (core.media). 'x-accel-redirect' для nginx или
+# 'x-sendfile' для Apache передают тело файла веб-серверу; None -- файл
+# отдает приложение.
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default=None)
+# Внутренний location nginx, который смотрит на MEDIA_ROOT.
+MEDIA_OFFLOAD_PREFIX = '/protected-media/'
+# Файлы с этими префиксами не меняются и кэшируются браузером на год.
+MEDIA_IMMUTABLE_PREFIXES = ('cache/',)
+MEDIA_MAX_AGE = 60 * 60
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -154,11 +203,134 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 OBJECTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+SYNDICATION_ITEMS = 20
+
+# Сколько строк читать из базы за раз при выгрузке данных пользователя.
+EXPORT_CHUNK_SIZE = 2000
+
+# Посты авторов, у которых подписчиков больше этого числа, не раскладываются
+# по лентам подписчиков, а подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_BATCH_SIZE = 500
+
+# Рекомендации «кого почитать» (posts.recommendations): сколько хранить
+# для пользователя и сколько показывать на странице.
+RECOMMENDATIONS_PER_USER = 20
+RECOMMENDATIONS_SHOWN = 5
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Фрагменты лент инвалидируются сменой поколения (posts.generations),
+# поэтому их можно хранить долго.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы для анонимных читателей кэшируются целиком тем же способом.
+PAGE_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+
+# Карточки постов в лентах (posts.cards): ключ меняется вместе с постом.
+CARD_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+
+# Загруженные картинки уменьшаются до этого размера по большей стороне
+# и перекодируются без метаданных (posts.images).
+POST_IMAGE_MAX_SIZE = 2048
+POST_IMAGE_QUALITY = 85
+
+# Размеры миниатюр картинок постов, которые используют шаблоны:
+# имя -> (геометрия sorl-thumbnail, опции).
+POST_THUMBNAIL_SIZES = {
+    'card_480': ('480x170', {'crop': 'center', 'upscale': True}),
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'card_1440': ('1440x509', {'crop': 'center', 'upscale': True}),
+}
+
+# Варианты одной картинки для атрибута srcset: имя -> размеры.
+POST_THUMBNAIL_SRCSETS = {
+    'card': ('card_480', 'card', 'card_1440'),
+}
+
+# Формат миниатюр. Если Pillow собран без WebP, используется JPEG.
+POST_THUMBNAIL_FORMAT = 'WEBP'
+
+# Число процессов, создающих миниатюры в фоне.
+THUMBNAIL_WORKERS = 2
+
+# Кэш в памяти процесса перед общим для всех процессов кэшем в SQLite
+# (core.cache). Изменения из других процессов видны в памяти процесса не
+# позже чем через LOCAL_TIMEOUT секунд.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_BYTES': 64 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': config(
+            'CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Тесты используют общий кэш во временном каталоге.
+TEST_RUNNER = 'core.test_runner.TempCacheRunner'
+
+# Фоновые задачи (core.tasks) выполняет manage.py run_tasks. С TASKS_EAGER
+# задачи выполняются сразу при постановке, без рабочих процессов.
+TASKS_EAGER = config('TASKS_EAGER', default=False, cast=bool)
+TASKS_WORKERS = 2
+TASKS_BATCH_SIZE = 20
+TASKS_POLL_INTERVAL = 1
+# Пауза перед первым повтором упавшей задачи, дальше она удваивается.
+TASKS_RETRY_DELAY = 10
+# Сколько секунд задача остается за рабочим процессом, который ее занял;
+# после этого ее займет другой процесс.
+TASKS_CLAIM_TIMEOUT = 300
+
+# Профилирование запросов (core.profiling): заголовок Server-Timing и
+# строка лога на каждый запрос. При PROFILING_SAMPLE_RATE = N каждый N-й
+# запрос профилируется cProfile, статистика сохраняется в PROFILING_DIR.
+PROFILING = config('PROFILING', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0, cast=int)
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+# Время шаблонов и попадания в кэш считают обертки core.profiling.
+if PROFILING:
+    TEMPLATES[0]['BACKEND'] = 'core.profiling.ProfilingTemplates'
+    CACHES['profiled'] = CACHES['default']
+    CACHES['default'] = {
+        'BACKEND': 'core.profiling.ProfilingCache',
+        'OPTIONS': {'CACHE': 'profiled'},
     }
+
+# Метрики в формате Prometheus (core.metrics) на странице /metrics/.
+# В нескольких процессах WSGI-сервера задайте METRICS_DIR: процессы
+# сохраняют туда значения, а страница метрик складывает их.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=None)
+METRICS_FLUSH_INTERVAL = 1
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
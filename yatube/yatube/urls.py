@@ -14,10 +14,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
-from django.views.static import serve as mediaserve
+from django.urls import include, path, re_path
+
+from core import media, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,12 +25,13 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics/', metrics.export, name='metrics'),
 ]
 
 urlpatterns.append(
-    path(
+    re_path(
         f'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$',
-        mediaserve, {'document_root': settings.MEDIA_ROOT}
+        media.serve, name='media'
     )
 )
 
@@ -41,7 +42,4 @@ handler500 = 'core.views.server_error'
 
 if settings.DEBUG:
     import debug_toolbar
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)